@@ -0,0 +1,72 @@
+# anomaly_rules.py
+import numpy as np
+
+FEATURES = [
+    "solar_gen","solar_voltage","solar_current","consumption",
+    "battery_voltage","battery_current","battery_temp","soc",
+    "env_temp","env_humidity","relay_state"
+]
+
+SOLAR_FAULT = "Solar (disconnected/shaded)"
+BATTERY_FAULT = "Battery (overheating)"
+RELAY_FAULT = "Relay/Load (mismatch)"
+
+# Device lists indexed by the rule bitmask (solar=1, battery=2, relay=4).
+DEVICE_TABLE = []
+for _code in range(8):
+    _devices = [name for bit, name in ((1, SOLAR_FAULT), (2, BATTERY_FAULT), (4, RELAY_FAULT)) if _code & bit]
+    DEVICE_TABLE.append(_devices or ["Unknown anomaly"])
+
+
+# --- Single-row versions ---
+def classify_failure(row):
+    """Rule-based failure classification from raw features"""
+    failures = []
+    if row.get("solar_gen", 0) < 1 and row.get("solar_voltage", 0) > 15: failures.append(SOLAR_FAULT)
+    if row.get("battery_temp", 0) > 60: failures.append(BATTERY_FAULT)
+    if row.get("relay_state", 0) == 0 and row.get("consumption", 0) > 2: failures.append(RELAY_FAULT)
+    if not failures: failures.append("Unknown anomaly")
+    return failures
+
+def classify_severity(error, threshold):
+    """Classify anomaly severity"""
+    if error < threshold * 2: return "Low"
+    elif error < threshold * 5: return "Medium"
+    else: return "High"
+
+
+# --- Columnar versions ---
+def severity_labels(mse, threshold):
+    """classify_severity over a whole array of errors."""
+    mse = np.asarray(mse)
+    return np.select([mse < threshold * 2, mse < threshold * 5], ["Low", "Medium"], default="High")
+
+SEVERITY_LEVELS = ["Low", "Medium", "High"]
+
+def severity_codes(mse, threshold):
+    """severity_labels as int8 indices into SEVERITY_LEVELS."""
+    mse = np.asarray(mse)
+    return np.select([mse < threshold * 2, mse < threshold * 5], [0, 1], default=2).astype(np.int8)
+
+def failure_codes(X, features=FEATURES):
+    """Evaluates the three device rules as column masks; returns a bitmask per row."""
+    col = {name: X[:, i] for i, name in enumerate(features)}
+    solar = (col["solar_gen"] < 1) & (col["solar_voltage"] > 15)
+    battery = col["battery_temp"] > 60
+    relay = (col["relay_state"] == 0) & (col["consumption"] > 2)
+    return solar.astype(np.int8) | (battery.astype(np.int8) << 1) | (relay.astype(np.int8) << 2)
+
+def anomaly_columns(X, mse, threshold, features=FEATURES):
+    """Returns (is_anomaly, severity, device_code) arrays for a scored batch."""
+    is_anomaly = np.asarray(mse) > threshold
+    return is_anomaly, severity_labels(mse, threshold), failure_codes(X, features)
+
+def build_results(timestamps, X, mse, threshold, features=FEATURES):
+    """Assembles the predict_anomalies JSON result list from columnar arrays."""
+    is_anomaly, severity, codes = anomaly_columns(X, mse, threshold, features)
+    return [
+        {"timestamp": ts, "Anomaly": True, "Severity": sev, "Devices": list(DEVICE_TABLE[code])}
+        if flag else
+        {"timestamp": ts, "Anomaly": False, "Severity": None, "Devices": ["System Normal"]}
+        for ts, flag, sev, code in zip(timestamps, is_anomaly.tolist(), severity.tolist(), codes.tolist())
+    ]
@@ -0,0 +1,73 @@
+# anomaly_service.py
+# Heavy anomaly-detection state, kept out of main.py so the load/solar endpoints
+# never import it; main.py imports this module inside the anomaly handlers only.
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from anomaly_rules import FEATURES, build_results
+from model_registry import registry
+
+# Concurrent small payloads are coalesced into one forward pass per window.
+# ANOMALY_BATCH_MAX_WAIT_MS=0 disables coalescing.
+ANOMALY_BATCH_MAX_ROWS = int(os.environ.get("ANOMALY_BATCH_MAX_ROWS", "2048"))
+ANOMALY_BATCH_MAX_WAIT_MS = float(os.environ.get("ANOMALY_BATCH_MAX_WAIT_MS", "5"))
+
+_keras_detector = None
+_batcher = None
+_streaming_scorer = None
+_lock = threading.Lock()
+
+
+def get_detector():
+    """Returns the NumPy autoencoder; TensorFlow is only imported if autoencoder.npz is missing."""
+    global _keras_detector
+    if os.path.exists(registry.path("anomaly_detector")):
+        return registry.get("anomaly_detector")
+    from numpy_autoencoder import NumpyAutoencoder
+    model = registry.get("anomaly_model")
+    scaler = registry.get("anomaly_scaler")
+    threshold = registry.get("anomaly_threshold")
+    key = (id(model), id(scaler), threshold)
+    if _keras_detector is None or _keras_detector[0] != key:
+        _keras_detector = (key, NumpyAutoencoder.from_keras(model, scaler, threshold))
+    return _keras_detector[1]
+
+
+def score(X):
+    """Per-row reconstruction MSE, through the micro-batcher when enabled."""
+    global _batcher
+    if ANOMALY_BATCH_MAX_WAIT_MS <= 0:
+        return get_detector().score(X)[1]
+    with _lock:
+        if _batcher is None:
+            from micro_batch import MicroBatcher
+            _batcher = MicroBatcher(lambda batch: get_detector().score(batch)[1],
+                                    ANOMALY_BATCH_MAX_ROWS, ANOMALY_BATCH_MAX_WAIT_MS)
+    return _batcher.submit(X)
+
+
+def streaming_scorer():
+    global _streaming_scorer
+    with _lock:
+        if _streaming_scorer is None:
+            from streaming_scorer import StreamingScorer
+            _streaming_scorer = StreamingScorer(window=int(os.environ.get("STREAM_WINDOW", "256")),
+                                                alpha=float(os.environ.get("STREAM_EWMA_ALPHA", "0.2")))
+    return _streaming_scorer
+
+
+def records_to_features(records):
+    """Parses JSON sensor records into (DataFrame, raw feature matrix)."""
+    df = pd.DataFrame.from_records(records)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    for col in FEATURES:
+        if col not in df.columns: df[col] = 0
+    return df, df[FEATURES].astype(float).values
+
+
+def warm_up():
+    """Loads the detector and runs one tiny forward pass so the first request skips both."""
+    get_detector().score(np.zeros((1, len(FEATURES))))
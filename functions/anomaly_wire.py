@@ -0,0 +1,160 @@
+# anomaly_wire.py
+# Request/response encodings for predict_anomalies beyond the original per-record JSON.
+#
+# Requests (by Content-Type):
+#   application/json               {"records": [{...}, ...]}  (original) or
+#                                  {"columns": {"timestamp": [...], "solar_gen": [...], ...}}
+#   application/x-npz              np.savez file with "X" (n x FEATURES) or one array per feature,
+#                                  plus an optional "timestamp" array
+#   application/vnd.apache.arrow.stream   Arrow IPC stream with timestamp/feature columns (needs pyarrow)
+#
+# Responses (?format= or Accept, default follows the request; Arrow requests get npz):
+#   records | columns | ndjson (streamed) | npz.
+# ?anomalies_only=1 returns only anomalous rows, each tagged with its input row index.
+import io
+import json
+
+import numpy as np
+
+from anomaly_rules import (DEVICE_TABLE, FEATURES, SEVERITY_LEVELS, anomaly_columns, build_results,
+                           severity_codes)
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+NPZ = "application/x-npz"
+ARROW = "application/vnd.apache.arrow.stream"
+FORMATS = ("records", "columns", "ndjson", "npz")
+NDJSON_CHUNK_ROWS = 1000
+
+
+class Batch:
+    """Parsed request: echoed timestamps, the raw feature matrix and the request encoding."""
+
+    def __init__(self, timestamps, X, kind):
+        self.timestamps = timestamps
+        self.X = X
+        self.kind = kind
+
+
+def columns_to_features(columns, n):
+    """Fills the feature matrix column by column; missing features are 0, nulls NaN."""
+    X = np.zeros((n, len(FEATURES)))
+    for j, name in enumerate(FEATURES):
+        if name in columns:
+            X[:, j] = np.asarray(columns[name], dtype=float)
+    return X
+
+
+def _column_length(columns):
+    lengths = {len(v) for v in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same length.")
+    return lengths.pop() if lengths else 0
+
+
+def parse_request(req):
+    """Decodes a predict_anomalies request into a Batch; raises ValueError on a bad body."""
+    if req.mimetype == NPZ:
+        with np.load(io.BytesIO(req.get_data()), allow_pickle=False) as arrays:
+            columns = {name: arrays[name] for name in arrays.files}
+        if "X" in columns:
+            X = np.asarray(columns["X"], dtype=float)
+            if X.ndim != 2 or X.shape[1] != len(FEATURES):
+                raise ValueError(f"'X' must have shape (n, {len(FEATURES)}).")
+        else:
+            X = columns_to_features(columns, _column_length(columns))
+        return Batch(columns.get("timestamp", np.arange(len(X))), X, "npz")
+
+    if req.mimetype == ARROW:
+        import pyarrow as pa
+        table = pa.ipc.open_stream(req.get_data()).read_all()
+        columns = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+        X = columns_to_features(columns, table.num_rows)
+        return Batch(columns.get("timestamp", np.arange(len(X))), X, "npz")
+
+    body = req.get_json(silent=True) or {}
+    if "columns" in body:
+        columns = body["columns"]
+        n = _column_length(columns)
+        return Batch(columns.get("timestamp", list(range(n))), columns_to_features(columns, n), "columns")
+    if "records" in body:
+        from anomaly_service import records_to_features
+        df, X = records_to_features(body["records"])
+        return Batch([str(ts) for ts in df["timestamp"]], X, "records")
+    raise ValueError("Missing 'records' or 'columns' field in JSON body.")
+
+
+def response_format(req, batch):
+    fmt = req.args.get("format")
+    if fmt is None:
+        accept = req.headers.get("Accept", "")
+        fmt = "npz" if NPZ in accept else "ndjson" if NDJSON in accept else batch.kind
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; expected one of {', '.join(FORMATS)}.")
+    return fmt
+
+
+def _timestamps_json(timestamps, rows):
+    if isinstance(timestamps, np.ndarray):
+        selected = timestamps[rows]
+        if np.issubdtype(selected.dtype, np.datetime64):
+            return np.datetime_as_string(selected).tolist()
+        return selected.tolist()
+    return [timestamps[i] for i in rows.tolist()]
+
+
+def _timestamps_array(timestamps, rows):
+    """Timestamps for np.savez: object arrays (strings with nulls) become unicode, null -> ""."""
+    selected = np.asarray(timestamps)[rows]
+    if selected.dtype == object:
+        return np.array(["" if t is None else str(t) for t in selected.tolist()], dtype=str)
+    return selected
+
+
+def encode(fmt, batch, mse, threshold, anomalies_only=False):
+    """Returns (body, mimetype); the ndjson body is a generator so it is streamed."""
+    is_anomaly = np.asarray(mse) > threshold
+    rows = np.flatnonzero(is_anomaly) if anomalies_only else np.arange(len(batch.X))
+    X, mse = batch.X[rows], np.asarray(mse)[rows]
+
+    if fmt == "records":
+        results = build_results(_timestamps_json(batch.timestamps, rows), X, mse, threshold)
+        if anomalies_only:
+            for row, result in zip(rows.tolist(), results):
+                result["row"] = row
+        return json.dumps({"results": results}), JSON
+
+    if fmt == "ndjson":
+        return _ndjson(batch, rows, X, mse, threshold, anomalies_only), NDJSON
+
+    flags, _, codes = anomaly_columns(X, mse, threshold)
+    severity = np.where(flags, severity_codes(mse, threshold), -1).astype(np.int8)
+    if fmt == "npz":
+        out = io.BytesIO()
+        np.savez(out, row=rows, timestamp=_timestamps_array(batch.timestamps, rows), mse=mse.astype(np.float32),
+                 anomaly=flags, severity=severity, device_code=codes, threshold=np.float64(threshold))
+        return out.getvalue(), NPZ
+
+    body = {
+        "n": len(batch.X), "threshold": float(threshold),
+        "timestamp": _timestamps_json(batch.timestamps, rows),
+        "anomaly": flags.tolist(), "mse": mse.tolist(),
+        # severity is an index into severity_levels (-1 when normal);
+        # device_code indexes devices (bitmask solar=1, battery=2, relay=4).
+        "severity": severity.tolist(), "device_code": codes.tolist(),
+        "severity_levels": SEVERITY_LEVELS, "devices": DEVICE_TABLE,
+    }
+    if anomalies_only:
+        body["row"] = rows.tolist()
+    return json.dumps(body), JSON
+
+
+def _ndjson(batch, rows, X, mse, threshold, anomalies_only):
+    """One JSON result per line, built and sent NDJSON_CHUNK_ROWS rows at a time."""
+    for start in range(0, len(rows), NDJSON_CHUNK_ROWS):
+        part = slice(start, start + NDJSON_CHUNK_ROWS)
+        results = build_results(_timestamps_json(batch.timestamps, rows[part]), X[part], mse[part], threshold)
+        if anomalies_only:
+            for row, result in zip(rows[part].tolist(), results):
+                result["row"] = row
+        yield "".join(json.dumps(result) + "\n" for result in results)
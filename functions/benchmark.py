@@ -0,0 +1,225 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from anomaly_rules import FEATURES
+from dataset import load_dataset
+
+SIZES = [1, 10, 100, 1_000, 10_000, 50_000]
+IMPORT_MODULES = ["numpy_autoencoder", "solar_features", "pandas", "main", "anomaly_service"]
+
+
+# ---- Inputs ----
+def synthetic_sensor_frame(n, seed=0, start=datetime(2025, 1, 1)):
+    """Plausible hourly sensor rows: a daylight curve plus noise for every FEATURES column."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, periods=n, freq="h")
+    daylight = np.clip(np.sin((ts.hour.to_numpy() - 6) / 12 * np.pi), 0, None)
+    solar_voltage = np.where(daylight > 0, 17 + 4 * daylight + rng.normal(0, 0.5, n), rng.uniform(0, 2, n))
+    solar_current = daylight * 3 + rng.normal(0, 0.1, n).clip(0)
+    relay_state = (rng.random(n) < 0.8).astype(float)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "solar_gen": solar_voltage * solar_current / 10,
+        "solar_voltage": solar_voltage,
+        "solar_current": solar_current,
+        "consumption": relay_state * rng.uniform(0.2, 1.8, n),
+        "battery_voltage": 12.4 + 0.6 * daylight + rng.normal(0, 0.1, n),
+        "battery_current": daylight * 2 - 0.5 + rng.normal(0, 0.1, n),
+        "battery_temp": 28 + 6 * daylight + rng.normal(0, 1, n),
+        "soc": 60 + 25 * daylight + rng.normal(0, 2, n),
+        "env_temp": 24 + 8 * daylight + rng.normal(0, 1, n),
+        "env_humidity": 60 - 15 * daylight + rng.normal(0, 3, n),
+        "relay_state": relay_state,
+    })
+
+
+def records_payload(df):
+    out = df.copy()
+    out["timestamp"] = out["timestamp"].astype(str)
+    return out.to_dict(orient="records")
+
+
+# ---- Measurement ----
+def time_call(fn, repeats, min_seconds=0.2):
+    """Runs fn until `repeats` calls and `min_seconds` have elapsed; returns latencies in seconds."""
+    fn()  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < repeats or (time.perf_counter() - start < min_seconds and len(latencies) < 10 * repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+def summarize(latencies, rows):
+    lat = np.asarray(latencies)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    return {
+        "rows": rows, "calls": len(lat),
+        "p50_ms": 1000 * p50, "p95_ms": 1000 * p95, "p99_ms": 1000 * p99,
+        "rows_per_sec": rows / p50 if p50 > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def import_times(modules=IMPORT_MODULES):
+    """Cold import time of each module in a fresh interpreter."""
+    results = {}
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        results[module] = float(proc.stdout.strip()) if proc.returncode == 0 else None
+    return results
+
+
+# ---- Benchmarks ----
+def bench_anomaly_endpoint(sizes, repeats):
+    """predict_anomalies as served: the real handler (parse, micro-batched score, encode) on a JSON request.
+
+    Only the Cloud Functions CORS layer and the per-request timing log line
+    are skipped, so latencies include the micro-batcher's wait
+    (ANOMALY_BATCH_MAX_WAIT_MS). The request is rebuilt from the encoded
+    body on every call.
+    """
+    import main
+    from werkzeug.test import EnvironBuilder
+    handler = main.predict_anomalies.__wrapped__.__wrapped__  # on_request -> instrumented -> handler
+    out = []
+    for n in sizes:
+        body = json.dumps({"records": records_payload(synthetic_sensor_frame(n))})
+
+        def run():
+            req = EnvironBuilder(method="POST", data=body, content_type="application/json").get_request()
+            response = handler(req)
+            if response.status_code != 200:
+                raise RuntimeError(f"predict_anomalies returned {response.status_code}: {response.get_data()[:200]}")
+
+        out.append(summarize(time_call(run, repeats), n))
+    return out
+
+
+def bench_infer_batch(sizes, repeats):
+    import infer_autoencoder
+    out = []
+    for n in sizes:
+        X = synthetic_sensor_frame(n)[FEATURES].values
+        out.append(summarize(time_call(lambda: infer_autoencoder.infer_batch(X), repeats), n))
+    return out
+
+
+def bench_predict_full_day(horizons_days, repeats):
+    import main
+    history = synthetic_sensor_frame(168)[["timestamp"]].assign(
+        generation_kw=np.random.default_rng(1).uniform(0, 3, 168))
+    out = []
+    for days in horizons_days:
+        start = history["timestamp"].iloc[-1] + timedelta(hours=1)
+        weather = synthetic_sensor_frame(24 * days, seed=2, start=start)
+        forecast = pd.DataFrame({"timestamp": weather["timestamp"], "irradiance": weather["solar_current"] * 250,
+                                 "temp": weather["env_temp"]})
+        out.append(summarize(time_call(lambda: main.predict_full_day(history, forecast), repeats), 24 * days))
+    return out
+
+
+def bench_predict_load(day_counts, repeats):
+    import main
+    model = main.registry.get("load_forecast")
+    out = []
+    for n_days in day_counts:
+        days = main._load_inputs_from_payload({"dates": [(datetime(2025, 1, 1) + timedelta(days=i)).date().isoformat()
+                                                         for i in range(n_days)]})
+        out.append(summarize(time_call(lambda: main._predict_load_batch(model, days), repeats), 24 * n_days))
+    return out
+
+
+def detector_accuracy(detector, df, rate=0.01, seed=12345):
+    """Precision/recall of mse > threshold against labelled injected anomalies."""
+    from inject_anomalies import inject, LABEL_COL, NORMAL
+    df_bad = inject(df, rate=rate, seed=seed)
+    _, mse = detector.score(df_bad[FEATURES].astype(float).values)
+    predicted = mse > detector.threshold
+    actual = df_bad[LABEL_COL].to_numpy() != NORMAL
+    tp = int((predicted & actual).sum())
+    fp = int((predicted & ~actual).sum())
+    fn = int((~predicted & actual).sum())
+    per_type = {
+        label: float(predicted[df_bad[LABEL_COL].to_numpy() == label].mean())
+        for label in sorted(set(df_bad[LABEL_COL])) if label != NORMAL
+    }
+    return {
+        "rows": len(df_bad), "injected": int(actual.sum()),
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+        "recall_by_type": per_type,
+        "false_positive_rate": fp / int((~actual).sum()) if (~actual).any() else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Latency/accuracy benchmark for the anomaly and forecast paths.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--data", help="normal (anomaly-free) dataset for the accuracy run (default: synthetic)")
+    parser.add_argument("--skip", default="", help="comma list of sections to skip: "
+                        "imports,anomaly,infer_batch,predict_full_day,predict_load,accuracy")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    skip = set(args.skip.split(","))
+
+    from numpy_autoencoder import load_detector
+    detector = load_detector()
+    report = {"revision": git_revision(), "created": datetime.now().isoformat(),
+              "python": platform.python_version(), "machine": platform.machine()}
+    sections = [
+        ("imports", lambda: import_times()),
+        ("anomaly", lambda: bench_anomaly_endpoint(sizes, args.repeats)),
+        ("infer_batch", lambda: bench_infer_batch(sizes, args.repeats)),
+        ("predict_full_day", lambda: bench_predict_full_day([1, 7], args.repeats)),
+        ("predict_load", lambda: bench_predict_load([1, 7, 30], args.repeats)),
+        ("accuracy", lambda: detector_accuracy(
+            detector, load_dataset(args.data, feature_columns=FEATURES) if args.data else synthetic_sensor_frame(50_000))),
+    ]
+    for name, run in sections:
+        if name in skip:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        try:
+            report[name] = run()
+        except Exception as e:
+            report[name] = {"error": str(e)}
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,129 @@
+# dataset.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_COL = "timestamp"
+
+
+def cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+# Parquet schema metadata key recording how the cache's timestamps were parsed.
+FORMAT_KEY = b"dataset.timestamp_format"
+
+
+def _cache_is_fresh(csv_path, parquet_path):
+    return os.path.exists(parquet_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path))
+
+
+def _cache_matches(parquet_path, timestamp_format):
+    """True if the cache was written by convert_csv with the same timestamp_format.
+
+    Caches without the metadata key predate it (and may hold down-cast
+    columns), so they are rebuilt too.
+    """
+    import pyarrow.parquet as pq
+    value = (pq.read_schema(parquet_path).metadata or {}).get(FORMAT_KEY)
+    return value is not None and value.decode() == (timestamp_format or "")
+
+
+def _cast(df, feature_columns, feature_dtype):
+    """Casts the caller's feature columns to feature_dtype; every other column keeps its dtype."""
+    if feature_columns:
+        present = [c for c in feature_columns if c in df.columns]
+        df[present] = df[present].astype(feature_dtype)
+    return df
+
+
+def convert_csv(csv_path, timestamp_format=None, feature_dtype=np.float32, parquet_path=None, feature_columns=None):
+    """Parses csv_path once and writes a Parquet copy next to it.
+
+    Timestamps become datetime64 (the timestamp_format used is recorded in
+    the file's metadata); every other column is stored with the dtype pandas
+    reads from the CSV, so the cache is the same whichever caller built it.
+    Returns the parsed DataFrame with `feature_columns` cast to feature_dtype.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    df = pd.read_csv(csv_path)
+    if TIMESTAMP_COL in df.columns:
+        df[TIMESTAMP_COL] = pd.to_datetime(df[TIMESTAMP_COL], format=timestamp_format)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[FORMAT_KEY] = (timestamp_format or "").encode()
+    table = table.replace_schema_metadata(metadata)
+    parquet_path = parquet_path or cache_path(csv_path)
+    tmp = parquet_path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, parquet_path)
+    return _cast(df, feature_columns, feature_dtype)
+
+
+def load_dataset(path, columns=None, timestamp_format=None, feature_dtype=np.float32, cache=True,
+                 feature_columns=None):
+    """Loads a sensor/load dataset, preferring the columnar cache.
+
+    `path` may be a .parquet/.feather file, a directory of Parquet
+    partitions (e.g. an export_history.py export) or a CSV. For a CSV, a fresh
+    sibling .parquet cache built with the same timestamp_format is read if
+    present (only `columns` are materialised); otherwise the CSV is parsed
+    and, when `cache` is set and pyarrow is installed, converted for next
+    time. Without pyarrow this falls back to plain CSV reading.
+
+    The cache holds the CSV's own dtypes; only `feature_columns` are cast to
+    feature_dtype, on every read, so cached and CSV reads return the same dtypes.
+    """
+    if path.endswith(".parquet"):
+        return _cast(pd.read_parquet(path, columns=columns), feature_columns, feature_dtype)
+    if os.path.isdir(path):
+        df = _cast(pd.read_parquet(path, columns=columns), feature_columns, feature_dtype)
+        return df.sort_values(TIMESTAMP_COL).reset_index(drop=True) if TIMESTAMP_COL in df.columns else df
+    if path.endswith(".feather"):
+        return _cast(pd.read_feather(path, columns=columns), feature_columns, feature_dtype)
+
+    parquet_path = cache_path(path)
+    try:
+        if _cache_is_fresh(path, parquet_path) and _cache_matches(parquet_path, timestamp_format):
+            return _cast(pd.read_parquet(parquet_path, columns=columns), feature_columns, feature_dtype)
+        if cache:
+            df = convert_csv(path, timestamp_format, feature_dtype, parquet_path, feature_columns)
+            return df[columns] if columns else df
+    except ImportError:
+        pass
+
+    df = pd.read_csv(path, usecols=columns)
+    if TIMESTAMP_COL in df.columns:
+        df[TIMESTAMP_COL] = pd.to_datetime(df[TIMESTAMP_COL], format=timestamp_format)
+    return _cast(df, feature_columns, feature_dtype)
+
+
+def iter_chunks(path, columns, chunksize):
+    """Yields DataFrame chunks of `columns`, from the Parquet cache when available."""
+    parquet_path = path if path.endswith(".parquet") else cache_path(path)
+    if _cache_is_fresh(path, parquet_path):
+        try:
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+            return
+        except ImportError:
+            pass
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunksize, parse_dates=[TIMESTAMP_COL])
+
+
+if __name__ == "__main__":
+    # Pre-convert exports once: python dataset.py data.csv [more.csv ...] [--format '%d-%m-%Y %H:%M']
+    args = sys.argv[1:]
+    fmt = None
+    if "--format" in args:
+        i = args.index("--format")
+        fmt = args[i + 1]
+        del args[i:i + 2]
+    for csv_file in args:
+        df = convert_csv(csv_file, fmt)
+        print(f"{csv_file} -> {cache_path(csv_file)} ({len(df):,} rows)")
@@ -0,0 +1,174 @@
+# export_history.py
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+from anomaly_rules import FEATURES
+from sensor_logger import HISTORY_PATH, push_id_time_ms
+
+EXPORT_DIR = "history_export"
+WATERMARK_FILE = "_watermark.json"
+PAGE_SIZE = 5000
+FLUSH_ROWS = 100_000
+
+# /sensor_history record fields (as written by sensor_logger) -> training FEATURES.
+FIELD_MAP = {
+    ("sensors", "solar_generation"): "solar_gen",
+    ("sensors", "solar_voltage"): "solar_voltage",
+    ("sensors", "solar_current"): "solar_current",
+    ("controls", "energy_consumption"): "consumption",
+    ("sensors", "battery_voltage"): "battery_voltage",
+    ("sensors", "battery_current"): "battery_current",
+    ("sensors", "ds18b20_temp"): "battery_temp",
+    ("sensors", "soc"): "soc",
+    ("sensors", "dht_temp"): "env_temp",
+    ("sensors", "dht_humidity"): "env_humidity",
+    ("controls", "Load"): "relay_state",
+}
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def record_to_row(key, record):
+    """Maps one history record onto [timestamp] + FEATURES; missing readings become NaN.
+
+    The record's own 'timestamp' is used when present, else the time encoded
+    in its push ID. Returns None for entries with neither.
+    """
+    if not isinstance(record, dict):
+        return None
+    ts = record.get("timestamp")
+    if ts is None:
+        ms = push_id_time_ms(key)
+        if ms is None:
+            return None
+        ts = datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None).isoformat()
+    row = {"timestamp": ts}
+    for (group, field), feature in FIELD_MAP.items():
+        row[feature] = _number((record.get(group) or {}).get(field))
+    return row
+
+
+def iter_pages(database, path=HISTORY_PATH, page_size=PAGE_SIZE, after_key=None):
+    """Yields key-ordered pages of (key, record) strictly after `after_key`."""
+    ref = database.reference(path)
+    while True:
+        query = ref.order_by_key()
+        if after_key is not None:
+            query = query.start_at(after_key)
+        # start_at is inclusive, so ask for one extra row to cover the repeated key.
+        page = query.limit_to_first(page_size + (after_key is not None)).get() or {}
+        items = list(page.items())  # already key-ordered
+        if items and items[0][0] == after_key:
+            items = items[1:]
+        if not items:
+            return
+        yield items
+        after_key = items[-1][0]
+        if len(items) < page_size:
+            return
+
+
+# --- Watermark ---
+def read_watermark(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {"last_key": None, "rows": 0}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_watermark(out_dir, watermark):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp, path)
+
+
+# --- Export ---
+def _write_partitions(out_dir, rows, last_key):
+    """Writes rows as out_dir/date=YYYY-MM-DD/part-<last_key>.parquet files (float32 features).
+
+    File names depend only on the batch's last key, so a rerun after a crash
+    between the write and the watermark update overwrites the same files.
+    """
+    import pandas as pd
+    df = pd.DataFrame(rows, columns=["timestamp"] + FEATURES)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    if df["timestamp"].dt.tz is not None:
+        df["timestamp"] = df["timestamp"].dt.tz_convert(None)
+    df[FEATURES] = df[FEATURES].astype(np.float32)
+    for day, part in df.groupby(df["timestamp"].dt.strftime("%Y-%m-%d")):
+        part_dir = os.path.join(out_dir, f"date={day}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{last_key}.parquet")
+        part.sort_values("timestamp").to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+    return len(df)
+
+
+def export(database, out_dir=EXPORT_DIR, path=HISTORY_PATH, page_size=PAGE_SIZE, flush_rows=FLUSH_ROWS):
+    """Appends every /sensor_history entry newer than the watermark to out_dir.
+
+    Pages are read in key order; rows are flushed to Parquet every
+    `flush_rows` and the watermark (last exported key) is advanced after each
+    flush, so an interrupted export resumes where it stopped. Returns the
+    updated watermark.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    watermark = read_watermark(out_dir)
+    if watermark.get("path", path) != path:
+        raise ValueError(f"{out_dir} holds an export of {watermark['path']}, not {path}.")
+    rows, last_key, skipped = [], watermark["last_key"], 0
+
+    def flush():
+        written = _write_partitions(out_dir, rows, last_key) if rows else 0
+        watermark.update(path=path, last_key=last_key, rows=watermark["rows"] + written,
+                         updated=datetime.now().isoformat())
+        write_watermark(out_dir, watermark)
+        rows.clear()
+
+    for page in iter_pages(database, path, page_size, watermark["last_key"]):
+        for key, record in page:
+            row = record_to_row(key, record)
+            if row is None:
+                skipped += 1
+            else:
+                rows.append(row)
+        last_key = page[-1][0]
+        if len(rows) >= flush_rows:
+            flush()
+    if last_key != watermark["last_key"]:
+        flush()
+    if skipped:
+        print(f"Skipped {skipped} entries without a usable timestamp.")
+    return watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally export /sensor_history to Parquet training data.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="export directory (train with: train_autoencoder.py <out>)")
+    parser.add_argument("--path", default=HISTORY_PATH, help="history path, e.g. sites/<id>/sensor_history")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--database-url", default=os.environ.get("FIREBASE_DATABASE_URL"))
+    args = parser.parse_args()
+
+    from firebase_admin import initialize_app, db
+    initialize_app(options={"databaseURL": args.database_url} if args.database_url else None)
+    before = read_watermark(args.out)["rows"]
+    watermark = export(db, args.out, args.path, args.page_size)
+    print(f"Exported {watermark['rows'] - before:,} new rows ({watermark['rows']:,} total) to {args.out}; "
+          f"watermark {watermark['last_key']}")
+
+
+if __name__ == "__main__":
+    main()
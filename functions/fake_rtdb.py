@@ -0,0 +1,158 @@
+# fake_rtdb.py
+import copy
+import threading
+import time
+
+
+def _key_order(key):
+    # RTDB orders integer-like keys numerically before all other string keys.
+    try:
+        return (0, int(key), "")
+    except ValueError:
+        return (1, 0, key)
+
+
+def _split(path):
+    return [p for p in path.strip("/").split("/") if p]
+
+
+class FakeDatabase:
+    """In-memory stand-in for firebase_admin.db.
+
+    Exposes reference(path) with the subset of the Reference/Query API used
+    by the functions. Every network-like call sleeps for `latency` seconds
+    (outside the lock) so sequential vs. concurrent access can be benchmarked
+    offline. `calls` counts simulated round trips.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self.root = copy.deepcopy(data) if data else {}
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reference(self, path="/"):
+        return FakeReference(self, _split(path))
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _get(self, parts):
+        node = self.root
+        for p in parts:
+            if not isinstance(node, dict) or p not in node:
+                return None
+            node = node[p]
+        return copy.deepcopy(node)
+
+    def _set(self, parts, value):
+        if not parts:
+            self.root = copy.deepcopy(value) if value is not None else {}
+            return
+        node = self.root
+        for p in parts[:-1]:
+            if not isinstance(node.get(p), dict):
+                node[p] = {}
+            node = node[p]
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = copy.deepcopy(value)
+
+
+class FakeQuery:
+    def __init__(self, ref):
+        self._ref = ref
+        self._start = None
+        self._end = None
+        self._first = None
+        self._last = None
+
+    def start_at(self, key):
+        self._start = str(key)
+        return self
+
+    def end_at(self, key):
+        self._end = str(key)
+        return self
+
+    def limit_to_first(self, n):
+        self._first = n
+        return self
+
+    def limit_to_last(self, n):
+        self._last = n
+        return self
+
+    def get(self):
+        value = self._ref.get()
+        if not isinstance(value, dict):
+            return value
+        keys = sorted(value, key=_key_order)
+        if self._start is not None:
+            keys = [k for k in keys if _key_order(k) >= _key_order(self._start)]
+        if self._end is not None:
+            keys = [k for k in keys if _key_order(k) <= _key_order(self._end)]
+        if self._first is not None:
+            keys = keys[:self._first]
+        if self._last is not None:
+            keys = keys[-self._last:] if self._last else []
+        return {k: value[k] for k in keys}
+
+
+class FakeReference:
+    def __init__(self, database, parts):
+        self._db = database
+        self._parts = parts
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    def child(self, path):
+        return FakeReference(self._db, self._parts + _split(path))
+
+    def get(self, shallow=False):
+        self._db._round_trip()
+        with self._db._lock:
+            value = self._db._get(self._parts)
+        if shallow and isinstance(value, dict):
+            return {k: True for k in value}
+        return value
+
+    def set(self, value):
+        self._db._round_trip()
+        with self._db._lock:
+            self._db._set(self._parts, value)
+
+    def delete(self):
+        self.set(None)
+
+    def push(self, value=""):
+        from sensor_logger import generate_push_id
+        ref = self.child(generate_push_id())
+        ref.set(value)
+        return ref
+
+    def update(self, value):
+        self._db._round_trip()
+        with self._db._lock:
+            for path, v in value.items():
+                self._db._set(self._parts + _split(path), v)
+
+    def transaction(self, transaction_update):
+        self._db._round_trip()
+        with self._db._lock:
+            new_value = transaction_update(self._db._get(self._parts))
+            self._db._set(self._parts, new_value)
+            return new_value
+
+    def order_by_key(self):
+        return FakeQuery(self)
@@ -0,0 +1,124 @@
+# history_store.py
+import os
+from datetime import datetime, timedelta
+
+# --- Layout under BUCKET_ROOT (per site: /sites/<id>/sensor_buckets) ---
+#   raw/<YYYY-MM-DD>/<HH:00>   one flattened reading per hour (kept RAW_RETENTION_DAYS days)
+#   daily/<YYYY-MM-DD>         {"count", "fields": {field: {min, max, sum, n, mean}}, "hours": {HH:00: true}}
+#   monthly/<YYYY-MM>          {"count", "fields": {...}}
+# Hour keys carry ":00" so RTDB never coerces a day's hours into an array.
+# Keys sort chronologically, so range reads are order_by_key().start_at().end_at()
+# over just the requested days/months.
+BUCKET_ROOT = "/sensor_buckets"
+RAW_RETENTION_DAYS = int(os.environ.get("SENSOR_RAW_RETENTION_DAYS", "30"))
+
+
+def flatten(record):
+    """Numeric readings of a sensor_logger record as {field: float}; bools become 0/1."""
+    values = {}
+    for group in ("sensors", "controls"):
+        for key, value in (record.get(group) or {}).items():
+            if isinstance(value, (bool, int, float)):
+                values[key] = float(value)
+    return values
+
+
+def _merge(node, values):
+    node = dict(node or {})
+    fields = dict(node.get("fields") or {})
+    for key, value in values.items():
+        agg = fields.get(key)
+        if agg is None:
+            agg = {"min": value, "max": value, "sum": value, "n": 1}
+        else:
+            agg = {"min": min(agg["min"], value), "max": max(agg["max"], value),
+                   "sum": agg["sum"] + value, "n": agg.get("n", 0) + 1}
+        agg["mean"] = agg["sum"] / agg["n"]
+        fields[key] = agg
+    node["fields"] = fields
+    node["count"] = node.get("count", 0) + 1
+    return node
+
+
+class HistoryStore:
+    """Writes hourly readings into day/hour buckets and keeps day/month rollups current.
+
+    The raw point for an hour is a plain set, so re-logging the same hour
+    overwrites it. The daily rollup records which hours it has absorbed and
+    is only updated (inside a transaction) for a new hour; the monthly rollup
+    is updated only when the daily one was, so aggregates never double count.
+    """
+
+    def __init__(self, database, root=BUCKET_ROOT, retention_days=RAW_RETENTION_DAYS):
+        self.database = database
+        self.root = root.rstrip("/")
+        self.retention_days = retention_days
+
+    # --- Writes ---
+    def raw_point(self, record, timestamp=None):
+        """(path, value) of the record's raw hourly point, for batching into a multi-path update."""
+        ts = timestamp or datetime.fromisoformat(record["timestamp"])
+        return f"{self.root}/raw/{ts:%Y-%m-%d}/{ts:%H}:00", dict(flatten(record), timestamp=ts.isoformat())
+
+    def rollup(self, record, timestamp=None):
+        """Folds the record into its day and month rollups (one transaction each, the month only if new)."""
+        ts = timestamp or datetime.fromisoformat(record["timestamp"])
+        day, hour, month = ts.strftime("%Y-%m-%d"), ts.strftime("%H:00"), ts.strftime("%Y-%m")
+        values = flatten(record)
+        applied = False
+
+        def add_to_day(node):
+            nonlocal applied
+            applied = not (node and hour in (node.get("hours") or {}))
+            if not applied:
+                return node
+            node = _merge(node, values)
+            node["hours"] = dict(node.get("hours") or {}, **{hour: True})
+            return node
+
+        self.database.reference(f"{self.root}/daily/{day}").transaction(add_to_day)
+        if applied:
+            self.database.reference(f"{self.root}/monthly/{month}").transaction(lambda node: _merge(node, values))
+        return applied
+
+    def write(self, record, timestamp=None):
+        """Stores one logged record and folds it into its day and month; returns the raw path."""
+        raw_path, value = self.raw_point(record, timestamp)
+        self.database.reference(raw_path).set(value)
+        self.rollup(record, timestamp)
+        return raw_path
+
+    def prune(self, now=None):
+        """Deletes raw day buckets older than retention_days in one multi-path update; rollups are kept."""
+        if self.retention_days <= 0:
+            return []
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        days = self.database.reference(f"{self.root}/raw").get(shallow=True) or {}
+        expired = sorted(day for day in days if day < cutoff)
+        if expired:
+            self.database.reference(f"{self.root}/raw").update({day: None for day in expired})
+        return expired
+
+    # --- Range reads ---
+    def _range(self, bucket, start_key, end_key):
+        query = self.database.reference(f"{self.root}/{bucket}").order_by_key().start_at(start_key).end_at(end_key)
+        return query.get() or {}
+
+    def raw(self, start, end):
+        """Hourly points with start <= timestamp <= end, oldest first; reads only the covered days."""
+        days = self._range("raw", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        lo, hi = start.strftime("%Y-%m-%d %H:00"), end.strftime("%Y-%m-%d %H:00")
+        points = []
+        for day in sorted(days):
+            for hour in sorted(days[day] or {}):
+                if lo <= f"{day} {hour}" <= hi:
+                    points.append(days[day][hour])
+        return points
+
+    def daily(self, start, end):
+        """{YYYY-MM-DD: rollup} for the days from start to end inclusive."""
+        return self._range("daily", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+
+    def monthly(self, start, end):
+        """{YYYY-MM: rollup} for the months from start to end inclusive."""
+        return self._range("monthly", start.strftime("%Y-%m"), end.strftime("%Y-%m"))
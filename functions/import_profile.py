@@ -0,0 +1,63 @@
+# import_profile.py
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# python -X importtime writes "import time: self [us] | cumulative | imported package" to stderr.
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(module, env=None):
+    """Imports `module` in a fresh interpreter under -X importtime.
+
+    Returns (total_seconds, rows) where rows are (module, self_us,
+    cumulative_us, depth) in import order. A failing import raises
+    RuntimeError with the child's stderr.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"import {module} failed")
+    total = sum(self_us for _, self_us, _, _ in rows) / 1e6
+    return total, rows
+
+
+def top_level(rows, limit):
+    """Modules at the top two import levels, heaviest cumulative first."""
+    direct = [r for r in rows if r[3] <= 1]
+    return sorted(direct, key=lambda r: r[2], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-import report for the Cloud Functions modules.")
+    parser.add_argument("modules", nargs="*", default=["main", "anomaly_service"])
+    parser.add_argument("--top", type=int, default=15, help="rows to show per module")
+    parser.add_argument("--raw", help="also write the raw -X importtime rows of each module to RAW.<module>.tsv")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            total, rows = profile_import(module)
+        except RuntimeError as e:
+            print(f"{module}: import failed ({e})")
+            continue
+        print(f"\n{module}: {1000 * total:.1f} ms, {len(rows)} modules")
+        print(f"  {'cumulative ms':>13}  {'self ms':>8}  module")
+        for name, self_us, cum_us, _ in top_level(rows, args.top):
+            print(f"  {cum_us / 1000:13.1f}  {self_us / 1000:8.1f}  {name}")
+        if args.raw:
+            with open(f"{args.raw}.{module}.tsv", "w") as f:
+                f.write("module\tself_us\tcumulative_us\tdepth\n")
+                f.writelines(f"{n}\t{s}\t{c}\t{d}\n" for n, s, c, d in rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,6 @@
 # infer_autoencoder.py
-import numpy as np
-import pandas as pd
-import joblib
-import os
-from tensorflow import keras
+from numpy_autoencoder import load_detector
+from dataset import load_dataset
 
 MODEL_DIR = "model_artifacts"
 FEATURES = [
@@ -12,20 +9,16 @@ FEATURES = [
     "env_temp","env_humidity","relay_state"
 ]
 
-# Load artifacts
-scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-autoencoder = keras.models.load_model(os.path.join(MODEL_DIR, "autoencoder.keras"))
-
-threshold = float(open(os.path.join(MODEL_DIR, "threshold.txt")).read().strip())
+# Load artifacts (autoencoder.npz, or the keras/scaler/threshold files as a fallback)
+detector = load_detector(MODEL_DIR)
+threshold = detector.threshold
 
 def infer_batch(X_raw):
     """
     X_raw: numpy array shape (n_samples, n_features) in original scale
     returns: list of dicts with mse and is_anomaly
     """
-    X_scaled = scaler.transform(X_raw)
-    X_pred = autoencoder.predict(X_scaled)
-    mse = np.mean(np.square(X_scaled - X_pred), axis=1)
+    _, mse = detector.score(X_raw)
     results = []
     for m in mse:
         results.append({"mse": float(m), "is_anomaly": bool(m > threshold)})
@@ -33,7 +26,7 @@ def infer_batch(X_raw):
 
 if __name__ == "__main__":
     # Example: load a small CSV or single row
-    df = pd.read_csv("solar_dataset_6788.csv", parse_dates=["timestamp"])
+    df = load_dataset("solar_dataset_6788.csv", columns=["timestamp"] + FEATURES, feature_columns=FEATURES)
     # Take last 5 rows as sample
     sample = df[FEATURES].tail(5).values
     res = infer_batch(sample)
@@ -1,8 +1,8 @@
 # infer_cli.py
-import sys, joblib, os
-import pandas as pd
-import numpy as np
-from tensorflow import keras
+import argparse
+import os
+from numpy_autoencoder import load_detector
+from stream_inference import iter_scored_chunks, add_stream_args
 
 MODEL_DIR = "model_artifacts"
 FEATURES = [
@@ -11,24 +11,28 @@ FEATURES = [
     "env_temp","env_humidity","relay_state"
 ]
 
-if len(sys.argv) < 2:
-    print("Usage: python infer_cli.py <csv_file>")
-    sys.exit(1)
+def main():
+    parser = argparse.ArgumentParser(description="Print anomalous rows of a sensor CSV.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--output", help="also append anomaly rows to this CSV")
+    add_stream_args(parser)
+    args = parser.parse_args()
 
-csv_file = sys.argv[1]
-df = pd.read_csv(csv_file, parse_dates=["timestamp"])
+    detector = load_detector(MODEL_DIR)
+    threshold = detector.threshold
+    if args.output and os.path.exists(args.output):
+        os.remove(args.output)
 
-scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-autoencoder = keras.models.load_model(os.path.join(MODEL_DIR, "autoencoder.keras"))
-threshold = float(open(os.path.join(MODEL_DIR, "threshold.txt")).read().strip())
+    # print anomalies only
+    print("timestamp, mse, anomaly")
+    for chunk, _, mse in iter_scored_chunks(args.csv_file, FEATURES, args.chunksize, args.workers,
+                                            MODEL_DIR, progress=not args.quiet, detector=detector):
+        mask = mse > threshold
+        for ts, m in zip(chunk["timestamp"][mask], mse[mask]):
+            print(f"{ts}  {m:.6f}  Anomaly=True")
+        if args.output and mask.any():
+            out = chunk.loc[mask, ["timestamp"]].assign(mse=mse[mask])
+            out.to_csv(args.output, mode="a", header=not os.path.exists(args.output), index=False)
 
-X = df[FEATURES].values.astype(float)
-X_scaled = scaler.transform(X)
-X_pred = autoencoder.predict(X_scaled)
-mse = np.mean((X_scaled - X_pred)**2, axis=1)
-
-# print anomalies only
-print("timestamp, mse, anomaly")
-for ts, m in zip(df["timestamp"], mse):
-    if m > threshold:
-        print(f"{ts}  {m:.6f}  Anomaly=True")
+if __name__ == "__main__":
+    main()
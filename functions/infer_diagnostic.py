@@ -1,11 +1,11 @@
 # infer_diagnostic.py
+import argparse
+import os
 import numpy as np
 import pandas as pd
-import sys
-import os
-import joblib
-import tensorflow as tf
-from tensorflow import keras
+from numpy_autoencoder import load_detector
+from anomaly_rules import anomaly_columns, DEVICE_TABLE
+from stream_inference import iter_scored_chunks, add_stream_args
 
 # ---- CONFIG ----
 MODEL_DIR = "model_artifacts"
@@ -14,83 +14,52 @@ FEATURES = [
     "battery_voltage","battery_current","battery_temp","soc",
     "env_temp","env_humidity","relay_state"
 ]
+DEVICE_NAMES = np.array([", ".join(d) for d in DEVICE_TABLE], dtype=object)
+PREVIEW_ROWS = 50
 
-# ---- 1. Load model, scaler, threshold ----
-model = keras.models.load_model(os.path.join(MODEL_DIR, "autoencoder.keras"))
-scaler = joblib.load(os.path.join(MODEL_DIR, "scaler.pkl"))
-with open(os.path.join(MODEL_DIR, "threshold.txt"), "r") as f:
-    THRESHOLD = float(f.read().strip())
-
-# ---- 2. Helper functions ----
-def classify_failure(row):
-    """Rule-based failure classification from raw features"""
-    failures = []
-    if row["solar_gen"] < 1 and row["solar_voltage"] > 15:
-        failures.append("Solar (disconnected/shaded)")
-    if row["battery_temp"] > 60:
-        failures.append("Battery (overheating)")
-    if row["relay_state"] == 0 and row["consumption"] > 2:
-        failures.append("Relay/Load (mismatch)")
-    if not failures:
-        failures.append("Unknown anomaly")
-    return failures
-
-def classify_severity(error, threshold):
-    """Classify anomaly severity"""
-    if error < threshold * 2:
-        return "Low"
-    elif error < threshold * 5:
-        return "Medium"
-    else:
-        return "High"
-
-# ---- 3. Load dataset ----
-if len(sys.argv) < 2:
-    print("Usage: python infer_diagnostic.py <dataset.csv>")
-    sys.exit(1)
-
-csv_file = sys.argv[1]
-df = pd.read_csv(csv_file, parse_dates=["timestamp"])
-X = df[FEATURES].astype(float).values
-X_scaled = scaler.transform(X)
-
-# ---- 4. Run inference ----
-X_pred = model.predict(X_scaled, verbose=0)
-mse = np.mean(np.square(X_scaled - X_pred), axis=1)
-
-# # ---- 5. Evaluate row by row ----
-# for i, row in df.iterrows():
-#     ts = row["timestamp"]
-#     error = mse[i]
+def diagnose(timestamps, X, mse, threshold):
+    """Builds the diagnostic result frame for one scored chunk."""
+    is_anomaly, severity, codes = anomaly_columns(X, mse, threshold, FEATURES)
+    return pd.DataFrame({
+        "timestamp": np.asarray(timestamps),
+        "Anomaly": is_anomaly,
+        "Severity": np.where(is_anomaly, severity, "None"),
+        "Devices": np.where(is_anomaly, DEVICE_NAMES[codes], "System Normal"),
+    })
 
-#     if error > THRESHOLD:
-#         severity = classify_severity(error, THRESHOLD)
-#         failures = classify_failure(row)
-#         print(f"{ts}\nAnomaly = True\nSeverity = {severity}\nDevices = {', '.join(failures)}\n")
-#     else:
-#         print(f"{ts}\nAnomaly = False\nSystem Normal\n")
-# ---- 5. Evaluate row by row ----
-results = []
+def main():
+    parser = argparse.ArgumentParser(description="Score a sensor CSV and classify anomalous devices.")
+    parser.add_argument("csv_file")
+    parser.add_argument("--output", default="diagnostic_results.csv")
+    parser.add_argument("--anomalies-only", action="store_true", help="only write anomalous rows")
+    add_stream_args(parser)
+    args = parser.parse_args()
 
-for i, row in df.iterrows():
-    ts = row["timestamp"]
-    error = mse[i]
+    # ---- 1. Load model, scaler, threshold ----
+    detector = load_detector(MODEL_DIR)
+    threshold = detector.threshold
 
-    if error > THRESHOLD:
-        severity = classify_severity(error, THRESHOLD)
-        failures = classify_failure(row)
-        results.append([ts, True, severity, ", ".join(failures)])
-    else:
-        results.append([ts, False, "None", "System Normal"])
+    # ---- 2. Score the dataset chunk by chunk, appending results as we go ----
+    if os.path.exists(args.output):
+        os.remove(args.output)
+    preview = []
+    preview_rows = 0
+    for chunk, X, mse in iter_scored_chunks(args.csv_file, FEATURES, args.chunksize, args.workers,
+                                            MODEL_DIR, progress=not args.quiet, detector=detector):
+        results_df = diagnose(chunk["timestamp"], X, mse, threshold)
+        if args.anomalies_only:
+            results_df = results_df[results_df["Anomaly"]]
+        results_df.to_csv(args.output, mode="a", header=not os.path.exists(args.output), index=False)
+        if preview_rows < PREVIEW_ROWS:
+            preview.append(results_df.head(PREVIEW_ROWS - preview_rows))
+            preview_rows += len(preview[-1])
 
-# Convert results to DataFrame
-results_df = pd.DataFrame(results, columns=["timestamp", "Anomaly", "Severity", "Devices"])
+    print(f"✅ Results saved to {args.output}")
 
-# Save all results to CSV
-out_file = "diagnostic_results.csv"
-results_df.to_csv(out_file, index=False)
-print(f"✅ Results saved to {out_file}")
+    # Print a preview in terminal (first 50 rows)
+    print(f"\n🔎 Preview (first {PREVIEW_ROWS} rows):\n")
+    if preview:
+        print(pd.concat(preview).to_string(index=False))
 
-# Print a preview in terminal (first 50 rows)
-print("\n🔎 Preview (first 50 rows):\n")
-print(results_df.head(50).to_string(index=False))
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,118 @@
 # inject_anomalies.py
-import pandas as pd
+import argparse
 import numpy as np
+from dataset import load_dataset
 
-RNG = np.random.default_rng(12345)  # deterministic for repeatability
-
-df = pd.read_csv("solar_dataset_6788.csv", parse_dates=["timestamp"])
-
-df_bad = df.copy()
-
-# pick daytime rows (using solar_voltage > 15 as daytime proxy)
-day_idx = df_bad.index[df_bad["solar_voltage"] > 15].tolist()
-
-# 1) Inject 3 solar-failure anomalies: set V,I,gen = 0
-solar_fail_idx = RNG.choice(day_idx, size=3, replace=False)
-for i in solar_fail_idx:
-    df_bad.loc[i, ["solar_voltage","solar_current","solar_gen"]] = [0.0, 0.0, 0.0]
-
-# 2) Inject 3 battery overheating anomalies
-batt_idx = RNG.choice(df_bad.index, size=3, replace=False)
-for i in batt_idx:
-    df_bad.loc[i, "battery_temp"] = 65.0
-
-# 3) Inject 3 relay mismatch anomalies: relay_state=0 but high consumption
-# prefer rows currently with relay_state==0; if not enough, pick random
-relay_off_idx = df_bad.index[df_bad["relay_state"] == 0].tolist()
-if len(relay_off_idx) < 3:
-    relay_mismatch_idx = RNG.choice(df_bad.index, size=3, replace=False)
-else:
-    relay_mismatch_idx = RNG.choice(relay_off_idx, size=3, replace=False)
-
-for i in relay_mismatch_idx:
-    df_bad.loc[i, "relay_state"] = 0
-    df_bad.loc[i, "consumption"] = max(df_bad.loc[i, "consumption"], 3.0)
-
-# Print which timestamps were modified
-print("Solar-failure injected at:")
-print(df_bad.loc[solar_fail_idx, "timestamp"].to_list())
-print("Battery-overheat injected at:")
-print(df_bad.loc[batt_idx, "timestamp"].to_list())
-print("Relay-mismatch injected at:")
-print(df_bad.loc[relay_mismatch_idx, "timestamp"].to_list())
-
-# Save new CSV
-out = "solar_dataset_500_bad.csv"
-df_bad.to_csv(out, index=False)
-print(f"Saved bad dataset to {out}")
+LABEL_COL = "anomaly_type"
+NORMAL = "normal"
+POINT_TYPES = ["solar_failure", "battery_overheat", "relay_mismatch"]
+SEGMENT_TYPES = ["drift", "stuck_sensor"]
+ALL_TYPES = POINT_TYPES + SEGMENT_TYPES
+
+
+def _pick(rng, candidates, rate, n_rows):
+    """Chooses round(rate * n_rows) rows (at least one) from the candidate indices."""
+    size = min(len(candidates), max(1, int(round(rate * n_rows))))
+    return rng.choice(candidates, size=size, replace=False) if size else np.empty(0, dtype=np.int64)
+
+
+def _segments(rng, n_rows, rate, length):
+    """Row indices of random contiguous segments covering about rate * n_rows rows; shape (k, length)."""
+    if n_rows <= length:
+        return np.empty((0, length), dtype=np.int64)
+    k = max(1, int(round(rate * n_rows / length)))
+    starts = rng.choice(n_rows - length, size=min(k, n_rows - length), replace=False)
+    return starts[:, None] + np.arange(length)
+
+
+def inject(df, rate=0.001, types=ALL_TYPES, seed=12345, segment_length=24,
+           drift_column="battery_voltage", drift_magnitude=3.0, stuck_column="soc"):
+    """Returns a copy of df with anomalies injected and a ground-truth label column.
+
+    Every type is applied to about `rate` of the rows with whole-column masks.
+    Drift adds a linear ramp up to drift_magnitude on drift_column over a
+    segment. Stuck-sensor freezes stuck_column at the segment's first value.
+    Segments are applied first; point anomalies then only land on rows still
+    labelled normal, so each row has a single label.
+    """
+    rng = np.random.default_rng(seed)  # deterministic for repeatability
+    df_bad = df.copy()
+    n = len(df_bad)
+    labels = np.full(n, NORMAL, dtype=object)
+
+    if "drift" in types:
+        seg = _segments(rng, n, rate, segment_length)
+        values = df_bad[drift_column].to_numpy(dtype=np.float64, copy=True)
+        ramp = np.linspace(0.0, drift_magnitude, segment_length)
+        np.add.at(values, seg.ravel(), np.tile(ramp, len(seg)))
+        df_bad[drift_column] = values
+        labels[seg.ravel()] = "drift"
+
+    if "stuck_sensor" in types:
+        seg = _segments(rng, n, rate, segment_length)
+        values = df_bad[stuck_column].to_numpy(copy=True)
+        values[seg] = values[seg[:, :1]]
+        df_bad[stuck_column] = values
+        labels[seg.ravel()] = "stuck_sensor"
+
+    normal = labels == NORMAL
+    # pick daytime rows (using solar_voltage > 15 as daytime proxy)
+    if "solar_failure" in types:
+        idx = _pick(rng, np.flatnonzero(normal & (df_bad["solar_voltage"].to_numpy() > 15)), rate, n)
+        for col in ["solar_voltage", "solar_current", "solar_gen"]:
+            df_bad[col] = _assign(df_bad[col], idx, 0.0)
+        labels[idx] = "solar_failure"
+        normal[idx] = False
+
+    if "battery_overheat" in types:
+        idx = _pick(rng, np.flatnonzero(normal), rate, n)
+        df_bad["battery_temp"] = _assign(df_bad["battery_temp"], idx, 65.0)
+        labels[idx] = "battery_overheat"
+        normal[idx] = False
+
+    # relay_state=0 but high consumption; prefer rows that already have the relay off
+    if "relay_mismatch" in types:
+        relay_off = np.flatnonzero(normal & (df_bad["relay_state"].to_numpy() == 0))
+        wanted = max(1, int(round(rate * n)))
+        idx = _pick(rng, relay_off if len(relay_off) >= wanted else np.flatnonzero(normal), rate, n)
+        df_bad["relay_state"] = _assign(df_bad["relay_state"], idx, 0)
+        consumption = df_bad["consumption"].to_numpy(copy=True)
+        consumption[idx] = np.maximum(consumption[idx], 3.0)
+        df_bad["consumption"] = consumption
+        labels[idx] = "relay_mismatch"
+
+    df_bad[LABEL_COL] = labels
+    return df_bad
+
+
+def _assign(series, idx, value):
+    values = series.to_numpy(copy=True)
+    values[idx] = value
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inject labelled synthetic anomalies into a sensor dataset.")
+    parser.add_argument("input", nargs="?", default="solar_dataset_6788.csv")
+    parser.add_argument("output", nargs="?", default="solar_dataset_500_bad.csv")
+    parser.add_argument("--rate", type=float, default=0.001, help="fraction of rows per anomaly type")
+    parser.add_argument("--types", default=",".join(ALL_TYPES))
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--segment-length", type=int, default=24, help="rows per drift/stuck segment")
+    args = parser.parse_args()
+
+    df = load_dataset(args.input)
+    df_bad = inject(df, args.rate, [t.strip() for t in args.types.split(",")], args.seed, args.segment_length)
+
+    # Print how many rows of each type were modified
+    print(df_bad[LABEL_COL].value_counts().to_string())
+
+    if args.output.endswith(".parquet"):
+        df_bad.to_parquet(args.output, index=False)
+    else:
+        df_bad.to_csv(args.output, index=False)
+    print(f"Saved bad dataset to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# instrumentation.py
+import contextvars
+import functools
+import io
+import json
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+# SERVER_TIMING=1 adds a Server-Timing header to every response (or ?timing=1 per request).
+# PROFILING=1 allows ?profile=1 / "X-Profile: 1" to run cProfile for that request;
+# PROFILE_SAMPLE_RATE=0.01 additionally profiles a random 1% of requests.
+SERVER_TIMING = os.environ.get("SERVER_TIMING") == "1"
+PROFILING = os.environ.get("PROFILING") == "1"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP = 25
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Per-request span accumulator; repeated spans of the same name are summed."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, seconds):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+    def as_dict(self):
+        return {name: {"ms": round(1000 * total, 3), "count": count} for name, (total, count) in self.spans.items()}
+
+    def server_timing(self, total):
+        parts = [f"{name.replace(':', '-')};dur={1000 * t:.2f}" for name, (t, _) in self.spans.items()]
+        parts.append(f"total;dur={1000 * total:.2f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def span(name):
+    """Times a block into the current request's trace; a no-op outside a request."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def _wants_profile(req):
+    if not PROFILING:
+        return False
+    if req.args.get("profile") == "1" or req.headers.get("X-Profile") == "1":
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def instrumented(endpoint):
+    """Wraps an https_fn handler with a request trace and a structured timing log line."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(req):
+            trace = Trace(endpoint)
+            token = _trace.set(trace)
+            profiler = None
+            if _wants_profile(req):
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                response = handler(req)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                _trace.reset(token)
+            total = time.perf_counter() - trace.start
+            entry = {
+                "severity": "INFO", "message": f"{endpoint} timing", "endpoint": endpoint,
+                "status": getattr(response, "status_code", None), "total_ms": round(1000 * total, 3),
+                "spans": trace.as_dict(),
+            }
+            if profiler is not None:
+                import pstats
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+                entry["profile"] = out.getvalue()
+            # One JSON object per line is parsed into structured logs by Cloud Logging.
+            print(json.dumps(entry), file=sys.stdout, flush=True)
+            if SERVER_TIMING or req.args.get("timing") == "1":
+                response.headers["Server-Timing"] = trace.server_timing(total)
+            return response
+        return wrapper
+    return decorator
@@ -1,189 +1,212 @@
 import os
-import pickle
 import json
+import threading
 from firebase_functions import https_fn, options
-from firebase_admin import initialize_app, db
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 import sys
 
-# Initialize Firebase app once
-initialize_app()
+# Keep module import light: every endpoint's instance imports this file, so
+# numpy/pandas, the anomaly stack and firebase_admin.db are imported on first use.
+# Profile with `python import_profile.py`.
+from model_registry import registry
+from instrumentation import instrumented, span
 
-# --- Global variables for lazy loading models ---
-load_model = None
-anomaly_model = None
-anomaly_scaler = None
-anomaly_threshold = None
+_firebase_lock = threading.Lock()
+_db = None
+
+def _get_db():
+    """Initializes the Firebase app on first use and returns the firebase_admin.db module."""
+    global _db
+    if _db is None:
+        with _firebase_lock:
+            if _db is None:
+                from firebase_admin import initialize_app, db
+                initialize_app()
+                _db = db
+    return _db
+
+
+# --- MODEL 1: LOAD FORECASTING ---
+LOAD_FEATURES = ["hour", "day_of_week", "day_of_month", "month", "quarter", "year", "is_weekend"]
+
+
+def _load_inputs_from_payload(data):
+    """Normalises the request 'data' field into a list of per-day calendar dicts.
+
+    Accepts the original single dict, a list of such dicts (one per site/day),
+    or a dict with a "dates" list of ISO dates whose calendar fields are derived.
+    """
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and "dates" in data:
+        days = []
+        for d in data["dates"]:
+            d = date.fromisoformat(str(d)[:10])
+            days.append({
+                "date": d.isoformat(), "day_of_week": d.weekday(), "day_of_month": d.day,
+                "month": d.month, "quarter": (d.month - 1) // 3 + 1, "year": d.year,
+                "is_weekend": int(d.weekday() >= 5),
+            })
+        return days
+    return [data]
+
+
+def _build_load_features(days):
+    """Builds one float64 feature row per (day, hour), in LOAD_FEATURES order, so all days are scored in one call."""
+    import numpy as np
+
+    n_days = len(days)
+    defaults = {"day_of_week": 0, "day_of_month": 1, "month": 1, "quarter": 1, "year": 2025, "is_weekend": 0}
+    X = np.empty((n_days * 24, len(LOAD_FEATURES)), dtype=np.float64)
+    X[:, 0] = np.tile(np.arange(24), n_days)
+    for j, col in enumerate(LOAD_FEATURES[1:], start=1):
+        X[:, j] = np.repeat([int(d.get(col, defaults[col])) for d in days], 24)
+    return X
+
+
+def _predict_load_batch(model, days):
+    """Scores every day's hourly rows with a single model.predict call."""
+    import numpy as np
+
+    if not days:
+        return []
+    with span("feature_build"):
+        features = _build_load_features(days)
+    with span("predict"):
+        preds = np.asarray(model.predict(features), dtype=float)
+    preds = np.round(preds.reshape(len(days), 24), 2)
+    return preds.tolist()
 
 
-# --- MODEL 1: LOAD FORECASTING (Unchanged) ---
 @https_fn.on_request(
     memory=options.MemoryOption.GB_1,
     cors=options.CorsOptions(cors_origins=["*"], cors_methods=["post"])
 )
+@instrumented("predict_load")
 def predict_load(req: https_fn.Request) -> https_fn.Response:
-    """Predicts load for the next 24 hours from JSON input."""
-    import pandas as pd
+    """Predicts hourly load from JSON input.
 
-    global load_model
+    A single 'data' dict returns {"predictions": [24 values]}; a list of dicts
+    or {"dates": [...]} returns one list of predictions per entry.
+    """
     try:
-        if load_model is None:
-            model_path = os.path.join(os.path.dirname(__file__), "load_forecasting_model.pkl")
-            with open(model_path, "rb") as f: load_model = pickle.load(f)
-        
+        load_model = registry.get("load_forecast")
+
         data = req.get_json()['data']
-        predictions = []
-        for hour in range(24):
-            current_input = { "hour": hour, "day_of_week": int(data.get("day_of_week", 0)), "day_of_month": int(data.get("day_of_month", 1)), "month": int(data.get("month", 1)), "quarter": int(data.get("quarter", 1)), "year": int(data.get("year", 2025)), "is_weekend": int(data.get("is_weekend", 0)) }
-            input_df = pd.DataFrame([current_input])
-            prediction = load_model.predict(input_df)
-            predictions.append(round(float(prediction[0]), 2))
-        return https_fn.Response(json.dumps({"predictions": predictions}), status=200, headers={"Content-Type": "application/json"})
+        days = _load_inputs_from_payload(data)
+        predictions = _predict_load_batch(load_model, days)
+        if isinstance(data, dict) and "dates" not in data:
+            body = {"predictions": predictions[0]}
+        else:
+            body = {"predictions": predictions, "dates": [d.get("date") for d in days]}
+        with span("serialize"):
+            payload = json.dumps(body)
+        return https_fn.Response(payload, status=200, headers={"Content-Type": "application/json"})
     except Exception as e:
         return https_fn.Response(json.dumps({"error": str(e)}), status=500, headers={"Content-Type": "application/json"})
 
 
 # --- NEW MODEL 2: TOTAL DAILY SOLAR FORECAST (Corrected) ---
+MAX_FORECAST_DAYS = 7
 
-def _fetch_historical_data():
-    """Fetches the last 168 hours of generation data from Realtime Database."""
-    import pandas as pd
-    history_ref = db.reference('history/generation')
-    snapshot = history_ref.order_by_key().limit_to_last(168).get()
-    
-    if not snapshot:
-        # If there's no data at all, return an empty DataFrame.
-        return pd.DataFrame({'timestamp': [], 'generation_kw': []})
-    
-    if isinstance(snapshot, dict):
-        historical_data = list(snapshot.values())
-    else:
-        historical_data = list(snapshot)
-
-    # Use a fixed interval from the current time to create timestamps
-    end_time = datetime.now()
-    timestamps = [end_time - timedelta(hours=i) for i in range(len(historical_data) - 1, -1, -1)]
-    
-    df = pd.DataFrame({
-        'timestamp': pd.to_datetime(timestamps),
-        # --- FIX #1: Handle potential null values from Firebase ---
-        'generation_kw': [float(e or 0.0) for e in historical_data]
-    })
-    return df
-
-def _fetch_weather_forecast():
-    """Fetches tomorrow's weather forecast from Open-Meteo."""
-    import pandas as pd
-    import requests
-    # Using Pune, India as the default location
-    lat, lon = 18.5204, 73.8567
-    url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,direct_radiation&forecast_days=2"
-    
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()['hourly']
-    
-    df = pd.DataFrame({
-        'timestamp': pd.to_datetime(data['time']),
-        'irradiance': [float(e or 0.0) for e in data['direct_radiation']],
-        'temp': [float(e or 0.0) for e in data['temperature_2m']]
-    })
-    
+def _fetch_historical_data(path='history/generation'):
+    """Returns the last 168 hours of generation data on a real-time hourly grid.
+
+    Backed by an instance-local cache that only downloads keys newer than the
+    last one it has seen.
+    """
+    from solar_history import get_history_cache
+    return get_history_cache(path).refresh(_get_db()).hourly_frame()
+
+def _fetch_weather_forecast(days=1, lat=18.5204, lon=73.8567):
+    """Fetches the hourly weather forecast for the next `days` days, starting tomorrow.
+
+    Defaults to Pune, India. Served by the cached weather provider (see
+    weather.py); set WEATHER_FIXTURE to run without network access.
+    """
+    from weather import get_provider
     tomorrow = date.today() + timedelta(days=1)
-    return df[df['timestamp'].dt.date == tomorrow].reset_index(drop=True)
+    return get_provider().hourly(lat, lon, tomorrow, days)
 
-def predict_full_day(historical_df, forecast_df, model_path="pv_forecast_model.pkl"):
-    """Predicts solar generation for each hour in the forecast."""
-    import pandas as pd
-    import numpy as np
+def predict_full_day(historical_df, forecast_df, model_path=None):
+    """Predicts solar generation for each hour in the forecast.
 
-    # --- FIX #2: Pad historical data if it's less than the required 168 hours ---
-    required_history = 168
-    if len(historical_df) < required_history:
-        padding_needed = required_history - len(historical_df)
-        first_timestamp = historical_df['timestamp'].min() if not historical_df.empty else datetime.now()
-        
-        padding_timestamps = [first_timestamp - timedelta(hours=i) for i in range(padding_needed, 0, -1)]
-        padding_df = pd.DataFrame({
-            'timestamp': pd.to_datetime(padding_timestamps),
-            'generation_kw': [0.0] * padding_needed
-        })
-        historical_df = pd.concat([padding_df, historical_df], ignore_index=True)
-
-    with open(model_path, "rb") as f:
-        model_dict = pickle.load(f)
+    Works for any horizon: features are built incrementally by
+    SolarFeatureEngine, so each step costs O(1) regardless of history length.
+    The model dict is served from the registry instead of being unpickled per call.
+    """
+    return predict_full_day_sites({None: (historical_df, forecast_df)}, model_path)[None]
+
+def predict_full_day_sites(site_inputs, model_path=None):
+    """Multi-site predict_full_day: {site: (historical_df, forecast_df)} -> {site: predictions_df}.
+
+    All sites are scored together, one model.predict call per horizon step.
+    """
+    from solar_features import recursive_forecast_sites
+
+    model_dict = registry.get_path(model_path) if model_path else registry.get("pv_forecast")
     model = model_dict["model"]
     features = model_dict["features"]
 
-    forecast_df['generation_kw'] = np.nan
-    # Use forecast 'temp' column, but historical 'temperature' column may not exist.
-    # Rename historical column if needed, but safer to handle concat carefully.
-    if 'temperature' in historical_df.columns:
-        historical_df = historical_df.rename(columns={'temperature': 'temp'})
-
-    combined_df = pd.concat([historical_df, forecast_df], ignore_index=True)
-    combined_df = combined_df.sort_values(by='timestamp').reset_index(drop=True)
-
-    predictions = []
-    for index, row in forecast_df.iterrows():
-        target_time = row['timestamp']
-        target_idx_query = combined_df[combined_df['timestamp'] == target_time]
-        if target_idx_query.empty: continue
-        target_idx = target_idx_query.index[0]
-
-        hour_sin = np.sin(2 * np.pi * target_time.hour / 24)
-        hour_cos = np.cos(2 * np.pi * target_time.hour / 24)
-        dow_sin = np.sin(2 * np.pi * target_time.weekday() / 7)
-        dow_cos = np.cos(2 * np.pi * target_time.weekday() / 7)
-
-        lag_1 = combined_df.loc[target_idx - 1, 'generation_kw']
-        lag_24 = combined_df.loc[target_idx - 24, 'generation_kw']
-        lag_168 = combined_df.loc[target_idx - 168, 'generation_kw']
-
-        rolling_window = combined_df.loc[target_idx - 24:target_idx - 1, 'generation_kw']
-        roll24_mean = rolling_window.mean()
-        roll24_std = rolling_window.std()
-        roll24_std = 0 if pd.isna(roll24_std) else roll24_std
-
-        input_data = {
-            "irradiance": row['irradiance'], "temp": row['temp'],
-            "lag_1": lag_1, "lag_24": lag_24, "lag_168": lag_168,
-            "roll24_mean": roll24_mean, "roll24_std": roll24_std,
-            "hour_sin": hour_sin, "hour_cos": hour_cos,
-            "dow_sin": dow_sin, "dow_cos": dow_cos
-        }
-
-        input_df = pd.DataFrame([input_data], columns=features)
-        prediction = model.predict(input_df)[0]
-        prediction = max(0, prediction)
-
-        predictions.append({'timestamp': target_time, 'predicted_kw': prediction})
-        combined_df.loc[target_idx, 'generation_kw'] = prediction
-
-    return pd.DataFrame(predictions)
+    histories, forecasts = {}, {}
+    for site, (historical_df, forecast_df) in site_inputs.items():
+        histories[site] = historical_df.sort_values(by='timestamp')['generation_kw'].to_numpy(dtype=float)
+        forecasts[site] = forecast_df
+    return recursive_forecast_sites(model, features, histories, forecasts)
+
+def _site_inputs(site_ids, days):
+    """Fetches history and weather for every site concurrently."""
+    from concurrent.futures import ThreadPoolExecutor
+    from sites import get_sites
+
+    def fetch(item):
+        site, cfg = item
+        return site, (_fetch_historical_data(cfg["history_path"]), _fetch_weather_forecast(days, cfg["lat"], cfg["lon"]))
+
+    sites = get_sites(site_ids)
+    with ThreadPoolExecutor(max_workers=min(8, len(sites))) as pool:
+        return dict(pool.map(fetch, sites.items()))
+
+def _generation_summary(predictions_df, days):
+    body = {"total_generation_kwh": float(predictions_df['predicted_kw'].sum())}
+    if days > 1:
+        per_day = predictions_df.groupby(predictions_df['timestamp'].dt.date)['predicted_kw'].sum()
+        body["daily_generation_kwh"] = {d.isoformat(): float(v) for d, v in per_day.items()}
+    return body
 
 @https_fn.on_request(
     memory=options.MemoryOption.GB_1,
     cors=options.CorsOptions(cors_origins=["*"], cors_methods=["get"])
 )
+@instrumented("predict_total_solar_generation")
 def predict_total_solar_generation(req: https_fn.Request) -> https_fn.Response:
     """
     HTTP endpoint that fetches data, runs a full-day forecast,
     and returns the total predicted generation for tomorrow.
     """
     try:
-        history_df = _fetch_historical_data()
-        forecast_df = _fetch_weather_forecast()
+        # Optional ?days=N (1-7) extends the recursive horizon beyond tomorrow.
+        days = min(max(int(req.args.get("days", 1)), 1), MAX_FORECAST_DAYS)
+        # Optional ?sites=a,b forecasts several installations in one batched run.
+        site_ids = [s for s in req.args.get("sites", "").split(",") if s]
+        with span("data_fetch"):
+            inputs = _site_inputs(site_ids or ["default"], days)
         
         # Check if weather forecast is empty (e.g., API issue)
-        if forecast_df.empty:
-            raise Exception("Failed to get weather forecast for tomorrow.")
+        empty = [site for site, (_, forecast_df) in inputs.items() if forecast_df.empty]
+        if empty:
+            raise Exception(f"Failed to get weather forecast for tomorrow ({', '.join(empty)}).")
 
-        daily_predictions_df = predict_full_day(history_df, forecast_df)
+        predictions = predict_full_day_sites(inputs)
         
-        total_generation = daily_predictions_df['predicted_kw'].sum()
+        if site_ids:
+            body = {"sites": {site: _generation_summary(df, days) for site, df in predictions.items()}}
+        else:
+            body = _generation_summary(predictions["default"], days)
         
-        return https_fn.Response(json.dumps({"total_generation_kwh": total_generation}),
+        with span("serialize"):
+            payload = json.dumps(body)
+        return https_fn.Response(payload,
                                   headers={"Content-Type": "application/json"})
 
     except Exception as e:
@@ -192,80 +215,109 @@ def predict_total_solar_generation(req: https_fn.Request) -> https_fn.Response:
                                   headers={"Content-Type": "application/json"})
 
 
-# --- MODEL 3: ANOMALY DETECTION (Unchanged) ---
-def classify_failure(row):
-    failures = []
-    if row.get("solar_gen", 0) < 1 and row.get("solar_voltage", 0) > 15: failures.append("Solar (disconnected/shaded)")
-    if row.get("battery_temp", 0) > 60: failures.append("Battery (overheating)")
-    if row.get("relay_state", 0) == 0 and row.get("consumption", 0) > 2: failures.append("Relay/Load (mismatch)")
-    if not failures: failures.append("Unknown anomaly")
-    return failures
-def classify_severity(error, threshold):
-    if error < threshold * 2: return "Low"
-    elif error < threshold * 5: return "Medium"
-    else: return "High"
+# --- MODEL 3: ANOMALY DETECTION ---
+# Detector, scaler, micro-batcher and streaming state live in anomaly_service,
+# imported inside the handlers so the load/solar endpoints never pay for them.
 
 @https_fn.on_request(
     memory=options.MemoryOption.GB_1,
     timeout_sec=300,
+    # Serve many device posts per instance so the micro-batcher can coalesce them.
+    cpu=1,
+    concurrency=80,
     cors=options.CorsOptions(cors_origins=["*"], cors_methods=["post"])
 )
+@instrumented("predict_anomalies")
 def predict_anomalies(req: https_fn.Request) -> https_fn.Response:
-    """Receives a JSON array of sensor records and returns anomaly predictions."""
-    import pandas as pd
-    import numpy as np
-    import joblib
-    import tensorflow as tf
-    from tensorflow import keras
-    
-    global anomaly_model, anomaly_scaler, anomaly_threshold
+    """Receives sensor records and returns anomaly predictions.
+
+    Besides the original {"records": [...]} JSON body, accepts columnar JSON,
+    .npz and Arrow bodies, and can answer as columns, streamed NDJSON or .npz
+    (?format=), optionally with only the anomalous rows (?anomalies_only=1).
+    See anomaly_wire.py.
+    """
     try:
-        if anomaly_model is None:
-            model_dir = os.path.join(os.path.dirname(__file__), "model_artifacts")
-            anomaly_model = keras.models.load_model(os.path.join(model_dir, "autoencoder.keras"))
-            anomaly_scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
-            with open(os.path.join(model_dir, "threshold.txt"), "r") as f: anomaly_threshold = float(f.read().strip())
-        
+        import anomaly_service
+        import anomaly_wire
+        detector = anomaly_service.get_detector()
+        anomaly_threshold = detector.threshold
+
+        with span("parse"):
+            try:
+                batch = anomaly_wire.parse_request(req)
+                fmt = anomaly_wire.response_format(req, batch)
+            except ValueError as e:
+                return https_fn.Response(json.dumps({"error": str(e)}), status=400, headers={"Content-Type": "application/json"})
+        with span("predict"):
+            mse = anomaly_service.score(batch.X)
+        with span("serialize"):
+            body, mimetype = anomaly_wire.encode(fmt, batch, mse, anomaly_threshold,
+                                                 anomalies_only=req.args.get("anomalies_only") == "1")
+        return https_fn.Response(body, status=200, mimetype=mimetype)
+    except Exception as e:
+        return https_fn.Response(json.dumps({"error": str(e)}), status=500, headers={"Content-Type": "application/json"})
+
+@https_fn.on_request(
+    memory=options.MemoryOption.GB_1,
+    timeout_sec=300,
+    cpu=1,
+    concurrency=80,
+    cors=options.CorsOptions(cors_origins=["*"], cors_methods=["post"])
+)
+@instrumented("predict_anomalies_stream")
+def predict_anomalies_stream(req: https_fn.Request) -> https_fn.Response:
+    """Stateful variant of predict_anomalies for one device's sliding window.
+
+    Body: {"device_id": ..., "records": [...]}. Records already seen for the
+    device (timestamp <= last scored) are skipped; only new ones are scored
+    and returned, along with the device's running residual statistics.
+    """
+    try:
+        import anomaly_service
         request_data = req.get_json()
-        if not request_data or 'records' not in request_data:
-            return https_fn.Response(json.dumps({"error": "Missing 'records' field in JSON body."}), status=400, headers={"Content-Type": "application/json"})
-        df = pd.DataFrame.from_records(request_data['records'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        features = ["solar_gen", "solar_voltage", "solar_current", "consumption", "battery_voltage", "battery_current", "battery_temp", "soc", "env_temp", "env_humidity", "relay_state"]
-        for col in features:
-            if col not in df.columns: df[col] = 0
-        X = df[features].astype(float).values
-        X_scaled = anomaly_scaler.transform(X)
-        X_pred = anomaly_model.predict(X_scaled, verbose=0)
-        mse = np.mean(np.square(X_scaled - X_pred), axis=1)
-        results = []
-        for i, row in df.iterrows():
-            error = mse[i]
-            if error > anomaly_threshold:
-                results.append({"timestamp": str(row["timestamp"]), "Anomaly": True, "Severity": classify_severity(error, anomaly_threshold), "Devices": classify_failure(row)})
-            else:
-                results.append({"timestamp": str(row["timestamp"]), "Anomaly": False, "Severity": None, "Devices": ["System Normal"]})
-        return https_fn.Response(json.dumps({"results": results}), status=200, headers={"Content-Type": "application/json"})
+        if not request_data or 'records' not in request_data or 'device_id' not in request_data:
+            return https_fn.Response(json.dumps({"error": "Missing 'device_id' or 'records' field in JSON body."}), status=400, headers={"Content-Type": "application/json"})
+        scorer = anomaly_service.streaming_scorer()
+        detector = anomaly_service.get_detector()
+        with span("parse"):
+            df, X = anomaly_service.records_to_features(request_data['records'])
+        timestamps_ns = df['timestamp'].values.astype('datetime64[ns]').astype('int64')
+        with span("predict"):
+            new_mask, mse, ewma, state = scorer.score(str(request_data['device_id']), timestamps_ns, X,
+                                                      detector, anomaly_service.score)
+        new_df = df[new_mask].sort_values('timestamp', kind='stable')
+        results = anomaly_service.build_results([str(ts) for ts in new_df['timestamp']], X[new_df.index.to_numpy()], mse, detector.threshold)
+        for result, value in zip(results, ewma.tolist()):
+            result["ewma_mse"] = value
+        body = {"device_id": request_data['device_id'], "results": results,
+                "skipped": int((~new_mask).sum()), "state": scorer.summary(state)}
+        with span("serialize"):
+            payload = json.dumps(body)
+        return https_fn.Response(payload, status=200, headers={"Content-Type": "application/json"})
     except Exception as e:
         return https_fn.Response(json.dumps({"error": str(e)}), status=500, headers={"Content-Type": "application/json"})
 
-# --- SCHEDULED LOGGER FUNCTION (Unchanged) ---
+# --- SCHEDULED LOGGER FUNCTION ---
 @https_fn.on_request(
     memory=options.MemoryOption.GB_1,
     cors=options.CorsOptions(cors_origins=["*"], cors_methods=["get"])
 )
+@instrumented("log_hourly_data")
 def log_hourly_data(req: https_fn.Request) -> https_fn.Response:
+    """Logs a sensor/control snapshot; ?sites=a,b logs several sites in one multi-path update."""
+    import sensor_logger
+
     print("Executing hourly data log...")
-    sensor_paths = { "solar_generation": "/solar_generation", "solar_voltage": "/sensors/solar_voltage", "solar_current": "/sensors/solar_current", "battery_voltage": "/sensors/battery_voltage", "battery_current": "/sensors/battery_current", "ds18b20_temp": "/sensors/ds18b20_temp", "soc": "/sensors/soc", "dht_temp": "/sensors/dht_temp", "dht_humidity": "/sensors/dht_humidity", }
-    control_paths = { "energy_consumption": "/energy_consumption", "Load": "/controls/Load", }
-    sensor_readings = {}
-    control_readings = {}
     try:
-        for key, path in sensor_paths.items(): sensor_readings[key] = db.reference(path).get()
-        for key, path in control_paths.items(): control_readings[key] = db.reference(path).get()
-        record = { "timestamp": datetime.now().isoformat(), "sensors": sensor_readings, "controls": control_readings, }
-        db.reference("/sensor_history").push(record)
-        message = "Successfully logged data snapshot to /sensor_history."
+        sites = [s for s in req.args.get("sites", "").split(",") if s]
+        if sites:
+            with span("rtdb"):
+                sensor_logger.log_sites(_get_db(), sites)
+            message = f"Successfully logged {len(sites)} site snapshots."
+        else:
+            with span("rtdb"):
+                sensor_logger.log_snapshot(_get_db())
+            message = "Successfully logged data snapshot to /sensor_history."
         print(message)
         return https_fn.Response(message, status=200)
     except Exception as e:
@@ -273,3 +325,35 @@ def log_hourly_data(req: https_fn.Request) -> https_fn.Response:
         print(error_message, file=sys.stderr)
         return https_fn.Response(error_message, status=500)
 
+
+# --- WARM-UP ---
+def warm_up(models=None):
+    """Pre-pays cold-start work without serving a request.
+
+    Imports numpy/pandas, initializes Firebase and loads the named registry
+    models (default: the load and PV forecasters). Any "anomaly_*" name loads
+    the anomaly detector through anomaly_service instead, so TensorFlow is
+    only touched when autoencoder.npz is missing.
+    """
+    import numpy as np  # noqa: F401
+    import pandas as pd  # noqa: F401
+    _get_db()
+    models = models or ["load_forecast", "pv_forecast"]
+    forecast_models = [m for m in models if not m.startswith("anomaly_")]
+    if forecast_models:
+        registry.warm_up(forecast_models)
+    if len(forecast_models) < len(models):
+        import anomaly_service
+        anomaly_service.warm_up()
+
+
+# Optional eager warm-up at cold start, e.g. WARM_MODELS=all or WARM_MODELS=load_forecast,pv_forecast.
+# WARM_UP_BACKGROUND=1 runs it on a thread so instance start-up is not blocked.
+if os.environ.get("WARM_MODELS"):
+    _names = os.environ["WARM_MODELS"]
+    _models = (["load_forecast", "pv_forecast", "anomaly_detector"] if _names == "all"
+               else [n.strip() for n in _names.split(",")])
+    if os.environ.get("WARM_UP_BACKGROUND") == "1":
+        threading.Thread(target=warm_up, args=(_models,), daemon=True).start()
+    else:
+        warm_up(_models)
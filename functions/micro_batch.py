@@ -0,0 +1,75 @@
+# micro_batch.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesces concurrent small scoring requests into one matrix call.
+
+    Callers block in submit(X). A single worker thread takes the first queued
+    request, keeps collecting for up to `max_wait_ms` or until `max_batch_rows`
+    rows are gathered, scores the stacked matrix once with `score_fn` and
+    hands every caller its own slice of the per-row result. Requests at least
+    `max_batch_rows` long gain nothing from batching and are scored directly.
+    """
+
+    def __init__(self, score_fn, max_batch_rows=2048, max_wait_ms=5.0):
+        self.score_fn = score_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) >= self.max_batch_rows:
+            return self.score_fn(X)
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((X, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                result = self.score_fn(np.vstack([X for X, _ in batch]))
+                offsets = np.cumsum([len(X) for X, _ in batch])[:-1]
+                for (_, future), part in zip(batch, np.split(result, offsets)):
+                    future.set_result(part)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.requests += len(batch)
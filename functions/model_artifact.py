@@ -0,0 +1,252 @@
+# model_artifact.py
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+# --- Single-file, versioned model artifact ---
+# Layout:  MAGIC | uint32 version | uint32 header length | JSON header | blobs
+# Every blob starts on an ALIGN-byte boundary. Arrays are stored raw (C order), so
+# they are np.memmap'ed read-only: instances on one host share the page cache
+# instead of each holding a private heap copy. The header carries everything
+# small: kind, feature list, scaler stats, threshold and the blob table.
+MAGIC = b"EGMODEL\0"
+VERSION = 1
+ALIGN = 64
+ARTIFACT_EXT = ".artifact"
+# Tolerated decision flips after int8 recalibration, relative to the sample's float anomalies
+# (anomalies are rare, so a share of all rows would hide a large change in what gets flagged).
+MAX_INT8_FLIP_RATE = 0.05
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def write_artifact(path, header, arrays=None, blobs=None):
+    """Writes header + arrays ({name: ndarray}) + raw byte blobs ({name: bytes}) atomically."""
+    arrays, blobs = arrays or {}, blobs or {}
+    payload = [(name, np.ascontiguousarray(a).tobytes()) for name, a in arrays.items()] + list(blobs.items())
+    table, offset = {}, 0
+    for name, data in payload:
+        table[name] = {"offset": offset, "length": len(data)}
+        offset += len(data) + _pad(len(data))
+    for name, a in arrays.items():
+        table[name].update(dtype=np.dtype(a.dtype).str, shape=list(a.shape))
+    header = dict(header, version=VERSION, blobs=table)
+    header_bytes = json.dumps(header).encode()
+    prefix = len(MAGIC) + 8 + len(header_bytes)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<II", VERSION, len(header_bytes)) + header_bytes + b"\0" * _pad(prefix))
+        for _, data in payload:
+            f.write(data + b"\0" * _pad(len(data)))
+    os.replace(tmp, path)
+    return path
+
+
+class Artifact:
+    """An opened artifact: `header` plus lazily memory-mapped arrays and raw blobs."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a model artifact")
+            version, header_len = struct.unpack("<II", f.read(8))
+            if version > VERSION:
+                raise ValueError(f"{path} has artifact version {version}; this code reads up to {VERSION}")
+            self.header = json.loads(f.read(header_len))
+        prefix = len(MAGIC) + 8 + header_len
+        self.data_offset = prefix + _pad(prefix)
+
+    def array(self, name):
+        spec = self.header["blobs"][name]
+        return np.memmap(self.path, dtype=np.dtype(spec["dtype"]), mode="r",
+                         offset=self.data_offset + spec["offset"], shape=tuple(spec["shape"]))
+
+    def blob(self, name):
+        spec = self.header["blobs"][name]
+        with open(self.path, "rb") as f:
+            f.seek(self.data_offset + spec["offset"])
+            return f.read(spec["length"])
+
+
+# --- Autoencoder ---
+def quantize_int8(w):
+    """Symmetric per-output-column int8 quantization; returns (q, scale)."""
+    w = np.asarray(w, dtype=np.float32)
+    scale = np.abs(w).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    return np.clip(np.round(w / scale), -127, 127).astype(np.int8), scale.astype(np.float32)
+
+
+def dequantize(detector):
+    """A copy of `detector` whose weights went through int8 and back, as an int8 artifact loads them."""
+    from numpy_autoencoder import NumpyAutoencoder
+    weights = []
+    for w in detector.weights:
+        q, scale = quantize_int8(w)
+        weights.append(q.astype(np.float32) * scale)
+    return NumpyAutoencoder(weights, detector.biases, detector.activations, detector.mean, detector.scale,
+                            detector.threshold, detector.features)
+
+
+def calibrate_int8(detector, X):
+    """Compares float and int8 anomaly decisions on sample rows X; returns (int8 threshold, report).
+
+    The int8 threshold is the MSE cut that flags as many sample rows as the
+    float weights do at detector.threshold; `report` gives the decision
+    flips at the unchanged and at the recalibrated threshold.
+    """
+    _, mse = detector.score(X)
+    _, mse_q = dequantize(detector).score(X)
+    flags = mse > detector.threshold
+    k, ordered = int(flags.sum()), np.sort(mse_q)
+    if k == 0:
+        threshold = float(ordered[-1])
+    elif k == len(ordered):
+        threshold = float(np.nextafter(ordered[0], -np.inf))
+    else:
+        threshold = float((ordered[-k - 1] + ordered[-k]) / 2)
+    report = {
+        "rows": len(X), "anomalies": k, "threshold": threshold, "float_threshold": detector.threshold,
+        "max_mse_drift": float(np.max(np.abs(mse_q - mse), initial=0.0)),
+        "flips_unchanged": int(np.sum(flags != (mse_q > detector.threshold))),
+        "flips": int(np.sum(flags != (mse_q > threshold))),
+    }
+    return threshold, report
+
+
+def save_autoencoder(detector, path, quantize=False, calibration=None):
+    """Stores a NumpyAutoencoder with float32 (or int8 + per-column scale) weights.
+
+    Pass the int8 threshold in detector.threshold; `calibration` (the
+    calibrate_int8 report) is kept in the header for reference.
+    """
+    arrays = {}
+    for i, (w, b) in enumerate(zip(detector.weights, detector.biases)):
+        if quantize:
+            arrays[f"w{i}"], arrays[f"w{i}_scale"] = quantize_int8(w)
+        else:
+            arrays[f"w{i}"] = np.asarray(w, dtype=np.float32)
+        arrays[f"b{i}"] = np.asarray(b, dtype=np.float32)
+    header = {
+        "kind": "autoencoder", "weights": "int8" if quantize else "float32",
+        "n_layers": len(detector.weights), "activations": detector.activations,
+        "features": detector.features, "threshold": detector.threshold,
+        "scaler": {"mean": detector.mean.tolist(), "scale": detector.scale.tolist()},
+    }
+    if calibration is not None:
+        header["calibration"] = calibration
+    return write_artifact(path, header, arrays)
+
+
+def _load_autoencoder(artifact):
+    from numpy_autoencoder import NumpyAutoencoder
+    h = artifact.header
+    weights = []
+    for i in range(h["n_layers"]):
+        w = artifact.array(f"w{i}")
+        if h["weights"] == "int8":
+            # Dequantized once at load; the int8 form only shrinks the file.
+            w = w.astype(np.float32) * artifact.array(f"w{i}_scale")
+        weights.append(w)
+    return NumpyAutoencoder(weights, [artifact.array(f"b{i}") for i in range(h["n_layers"])], h["activations"],
+                            h["scaler"]["mean"], h["scaler"]["scale"], h["threshold"], h["features"])
+
+
+# --- LightGBM ---
+def save_lightgbm(model, path, features=None, as_dict=False):
+    """Stores a LightGBM model (sklearn wrapper or Booster) in its native text format.
+
+    as_dict records that the source pickle was a {"model", "features"} dict
+    (pv_forecast_model.pkl), so loading returns the same shape. Raises
+    ValueError for anything that is not a LightGBM model.
+    """
+    from tree_engine import is_lightgbm
+    if not is_lightgbm(model):
+        raise ValueError(f"{type(model).__name__} is not a LightGBM model")
+    booster = getattr(model, "booster_", model)
+    features = list(features if features is not None else booster.feature_name())
+    header = {"kind": "lightgbm", "features": features, "container": "dict" if as_dict else "model"}
+    return write_artifact(path, header, blobs={"model.txt": booster.model_to_string().encode()})
+
+
+def _load_lightgbm(artifact):
+    import lightgbm as lgb
+    booster = lgb.Booster(model_str=artifact.blob("model.txt").decode())
+    if artifact.header["container"] == "dict":
+        return {"model": booster, "features": artifact.header["features"]}
+    return booster
+
+
+LOADERS = {"autoencoder": _load_autoencoder, "lightgbm": _load_lightgbm}
+
+
+def load_artifact(path):
+    """Loads any artifact into the object the serving code expects."""
+    artifact = Artifact(path)
+    return LOADERS[artifact.header["kind"]](artifact)
+
+
+def artifact_path(path):
+    return os.path.splitext(path)[0] + ARTIFACT_EXT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert existing model files into .artifact files.")
+    parser.add_argument("--model-dir", default="model_artifacts", help="autoencoder artifacts directory")
+    parser.add_argument("--int8", action="store_true", help="int8-quantize the autoencoder weights")
+    parser.add_argument("--sample", default=None,
+                        help="sensor dataset to calibrate --int8 on (default: 20,000 synthetic rows)")
+    parser.add_argument("--max-flip-rate", type=float, default=MAX_INT8_FLIP_RATE,
+                        help="refuse --int8 if flips exceed this fraction of the sample's anomalies")
+    parser.add_argument("--pickles", nargs="*", default=["load_forecasting_model.pkl", "pv_forecast_model.pkl"])
+    args = parser.parse_args()
+
+    import pickle
+    from tree_engine import is_lightgbm
+    for pkl in args.pickles:
+        with open(pkl, "rb") as f:
+            obj = pickle.load(f)
+        model = obj["model"] if isinstance(obj, dict) else obj
+        if not is_lightgbm(model):
+            # e.g. a sklearn GradientBoostingRegressor: keep serving the pickle.
+            print(f"{pkl}: {type(model).__name__} is not a LightGBM model; skipped")
+            continue
+        if isinstance(obj, dict):
+            out = save_lightgbm(model, artifact_path(pkl), obj.get("features"), as_dict=True)
+        else:
+            out = save_lightgbm(model, artifact_path(pkl))
+        print(f"{pkl} ({os.path.getsize(pkl):,} B) -> {out} ({os.path.getsize(out):,} B)")
+
+    from numpy_autoencoder import load_detector
+    # Always convert from the float npz/keras model, never from a previous artifact.
+    detector = load_detector(args.model_dir, artifact=False)
+    calibration = None
+    if args.int8:
+        from anomaly_rules import FEATURES
+        if args.sample:
+            from dataset import load_dataset
+            sample = load_dataset(args.sample, columns=FEATURES).dropna()
+        else:
+            from benchmark import synthetic_sensor_frame
+            sample = synthetic_sensor_frame(20_000)
+        detector.threshold, calibration = calibrate_int8(detector, sample[FEATURES].to_numpy(dtype=np.float64))
+        c = calibration
+        print(f"int8 on {c['rows']:,} sample rows ({c['anomalies']:,} anomalies): max MSE drift "
+              f"{c['max_mse_drift']:.3g}, {c['flips_unchanged']} decision flips at threshold "
+              f"{c['float_threshold']:.6g}, {c['flips']} at recalibrated threshold {c['threshold']:.6g}")
+        if c["flips"] > args.max_flip_rate * max(c["anomalies"], 1):
+            raise SystemExit(f"int8 flips {c['flips']} decisions against {c['anomalies']:,} sample anomalies "
+                             f"(> {args.max_flip_rate:.0%}); autoencoder artifact not written.")
+    out = save_autoencoder(detector, os.path.join(args.model_dir, "autoencoder" + ARTIFACT_EXT),
+                           quantize=args.int8, calibration=calibration)
+    print(f"autoencoder -> {out} ({os.path.getsize(out):,} B)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# model_registry.py
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from instrumentation import span
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# --- Loaders ---
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_joblib(path):
+    import joblib
+    return joblib.load(path)
+
+
+def load_threshold(path):
+    with open(path, "r") as f:
+        return float(f.read().strip())
+
+
+def load_numpy_autoencoder(path):
+    from numpy_autoencoder import NumpyAutoencoder
+    return NumpyAutoencoder.load(path)
+
+
+def load_model_artifact(path):
+    from model_artifact import load_artifact
+    return load_artifact(path)
+
+
+def load_tree_pickle(path):
+    """Model pickle (model or {"model", "features"} dict); LightGBM models get the fast tree engine attached."""
+    from tree_engine import wrap
+    return wrap(load_pickle(path))
+
+
+def load_tree_artifact(path):
+    from tree_engine import wrap
+    return wrap(load_model_artifact(path))
+
+
+def load_keras(path):
+    from tensorflow import keras
+    return keras.models.load_model(path)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class _Entry:
+    def __init__(self, sources):
+        self.sources = sources  # [(path, loader)]; the newest existing file is served
+        self.path, self.loader = sources[0]
+        self.value = None
+        self.sha256 = None
+        self.stat_key = None
+        self.load_seconds = None
+        self.loads = 0
+        self.checked_at = 0.0
+
+
+class ModelRegistry:
+    """Process-wide cache of model artifacts.
+
+    Each artifact is loaded once per instance and keyed by (mtime, size) and
+    its SHA-256. On access the file is re-stat'ed at most every
+    `check_interval` seconds; if it changed and the hash differs, it is
+    reloaded in place (hot reload). A touched-but-identical file only costs
+    a re-hash.
+
+    A name may have alternative sources (e.g. a pickle and its converted
+    .artifact). Every check serves whichever existing file is newest, later
+    sources winning ties, so copying in a retrained pickle replaces a stale
+    conversion instead of hiding behind it.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, check_interval=5.0):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, path, loader=load_pickle, alternatives=()):
+        """Registers `path`; `alternatives` are extra (path, loader) sources for the same model."""
+        sources = [(p if os.path.isabs(p) else os.path.join(self.base_dir, p), fn)
+                   for p, fn in [(path, loader), *alternatives]]
+        with self._lock:
+            self._entries[name] = _Entry(sources)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def path(self, name):
+        """Path that would be served for `name` right now."""
+        return _newest(self._entries[name].sources)[0]
+
+    def get(self, name):
+        entry = self._entries[name]
+        now = time.monotonic()
+        if entry.value is not None and now - entry.checked_at < self.check_interval:
+            return entry.value
+        with self._lock:
+            self._refresh(entry, now)
+            return entry.value
+
+    def get_path(self, path, loader=load_pickle):
+        """Loads an arbitrary artifact path through the cache."""
+        name = os.path.abspath(path if os.path.isabs(path) else os.path.join(self.base_dir, path))
+        if name not in self._entries:
+            self.register(name, name, loader)
+        return self.get(name)
+
+    def _refresh(self, entry, now):
+        entry.path, entry.loader = _newest(entry.sources)
+        st = os.stat(entry.path)
+        stat_key = (entry.path, st.st_mtime_ns, st.st_size)
+        entry.checked_at = now
+        if entry.value is not None and stat_key == entry.stat_key:
+            return
+        digest = file_sha256(entry.path)
+        entry.stat_key = stat_key
+        if entry.value is not None and digest == entry.sha256:
+            return
+        start = time.perf_counter()
+        with span("model_load"):
+            entry.value = entry.loader(entry.path)
+        entry.load_seconds = time.perf_counter() - start
+        entry.sha256 = digest
+        entry.loads += 1
+        print(f"Loaded model '{os.path.basename(entry.path)}' in {entry.load_seconds:.3f}s (sha256 {digest[:12]})")
+
+    def warm_up(self, names=None):
+        """Eagerly loads the given (default: all) artifacts; returns stats()."""
+        for name in names or list(self._entries):
+            self.get(name)
+        return self.stats()
+
+    def stats(self):
+        return {
+            name: {
+                "path": e.path, "sha256": e.sha256, "mtime_ns": e.stat_key[1] if e.stat_key else None,
+                "load_seconds": e.load_seconds, "loads": e.loads,
+            }
+            for name, e in self._entries.items()
+        }
+
+
+def _newest(sources):
+    """(path, loader) of the most recently modified existing source; the first one if none exist."""
+    best, best_mtime = sources[0], None
+    for path, loader in sources:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        if best_mtime is None or mtime >= best_mtime:
+            best, best_mtime = (path, loader), mtime
+    return best
+
+
+def _artifact_of(path, artifact_loader=load_model_artifact):
+    """The converted .artifact alternative for `path` (see model_artifact.py)."""
+    return os.path.splitext(path)[0] + ".artifact", artifact_loader
+
+
+# --- Default registry used by the Cloud Functions ---
+# Convert the pickles/npz with `python model_artifact.py` to serve the memory-mapped artifacts;
+# an artifact older than its pickle/npz is ignored.
+registry = ModelRegistry(check_interval=float(os.environ.get("MODEL_CHECK_INTERVAL_SEC", "5")))
+registry.register("load_forecast", "load_forecasting_model.pkl", load_tree_pickle,
+                  [_artifact_of("load_forecasting_model.pkl", load_tree_artifact)])
+registry.register("pv_forecast", "pv_forecast_model.pkl", load_tree_pickle,
+                  [_artifact_of("pv_forecast_model.pkl", load_tree_artifact)])
+registry.register("anomaly_detector", os.path.join("model_artifacts", "autoencoder.npz"), load_numpy_autoencoder,
+                  [_artifact_of(os.path.join("model_artifacts", "autoencoder.npz"))])
+registry.register("anomaly_model", os.path.join("model_artifacts", "autoencoder.keras"), load_keras)
+registry.register("anomaly_scaler", os.path.join("model_artifacts", "scaler.pkl"), load_joblib)
+registry.register("anomaly_threshold", os.path.join("model_artifacts", "threshold.txt"), load_threshold)
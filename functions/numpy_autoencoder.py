@@ -0,0 +1,153 @@
+# numpy_autoencoder.py
+import io
+import os
+import sys
+import numpy as np
+
+MODEL_DIR = "model_artifacts"
+NPZ_FILE = "autoencoder.npz"
+ARTIFACT_FILE = "autoencoder.artifact"
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "linear": lambda x: x,
+}
+
+
+class NumpyAutoencoder:
+    """Dense autoencoder + StandardScaler evaluated with plain NumPy.
+
+    Reproduces keras `model.predict` (float32 matmuls) and the per-row
+    reconstruction MSE used by the anomaly endpoints, without importing
+    TensorFlow.
+    """
+
+    def __init__(self, weights, biases, activations, mean, scale, threshold, features=None):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = list(activations)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.threshold = float(threshold)
+        self.features = list(features) if features is not None else None
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = int(data["n_layers"])
+            features = [str(f) for f in data["features"]] if "features" in data.files else None
+            return cls(
+                [data[f"w{i}"] for i in range(n_layers)],
+                [data[f"b{i}"] for i in range(n_layers)],
+                [str(a) for a in data["activations"]],
+                data["scaler_mean"], data["scaler_scale"], data["threshold"], features,
+            )
+
+    @classmethod
+    def from_keras(cls, model, scaler, threshold, features=None):
+        weights, biases, activations = [], [], []
+        for layer in model.layers:
+            params = layer.get_weights()
+            if not params:
+                continue
+            weights.append(params[0])
+            biases.append(params[1])
+            activations.append(layer.activation.__name__)
+        return cls(weights, biases, activations, scaler.mean_, scaler.scale_, threshold, features)
+
+    @classmethod
+    def from_keras_archive(cls, path, scaler, threshold, features=None):
+        """Reads a Keras 3 .keras archive (config.json + model.weights.h5) without TensorFlow; needs h5py."""
+        import json
+        import zipfile
+        import h5py
+        with zipfile.ZipFile(path) as archive:
+            config = json.loads(archive.read("config.json"))
+            with archive.open("model.weights.h5") as f, h5py.File(io.BytesIO(f.read()), "r") as h5:
+                weights, biases, activations = [], [], []
+                for layer in config["config"]["layers"]:
+                    if layer["class_name"] != "Dense":
+                        continue
+                    params = h5[f"layers/{layer['config']['name']}/vars"]
+                    weights.append(params["0"][()])
+                    biases.append(params["1"][()])
+                    activations.append(layer["config"]["activation"])
+        return cls(weights, biases, activations, scaler.mean_, scaler.scale_, threshold, features)
+
+    def save(self, path):
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        if self.features is not None:
+            arrays["features"] = np.array(self.features)
+        np.savez_compressed(
+            path, n_layers=len(self.weights), activations=np.array(self.activations),
+            scaler_mean=self.mean, scaler_scale=self.scale, threshold=self.threshold, **arrays,
+        )
+
+    def transform(self, X):
+        """StandardScaler.transform equivalent."""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict(self, X_scaled):
+        h = np.asarray(X_scaled, dtype=np.float32)
+        for w, b, act in zip(self.weights, self.biases, self.activations):
+            h = h @ w
+            h += b
+            h = ACTIVATIONS[act](h)
+        return h
+
+    def score(self, X):
+        """Returns (X_scaled, per-row reconstruction MSE) for raw features X."""
+        X_scaled = self.transform(X)
+        mse = np.mean(np.square(X_scaled - self.predict(X_scaled)), axis=1)
+        return X_scaled, mse
+
+
+def export_npz(model, scaler, threshold, path, features=None):
+    """Writes weights, scaler stats and threshold into one compact .npz artifact."""
+    NumpyAutoencoder.from_keras(model, scaler, threshold, features).save(path)
+    return path
+
+
+def load_detector(model_dir=MODEL_DIR, artifact=True):
+    """Loads the newer of autoencoder.artifact and the .npz, falling back to the keras/scaler/threshold trio.
+
+    An artifact older than the .npz is a stale conversion and is ignored;
+    artifact=False skips it altogether (e.g. to convert from the float npz).
+    """
+    artifact_path = os.path.join(model_dir, ARTIFACT_FILE)
+    npz_path = os.path.join(model_dir, NPZ_FILE)
+    if artifact and os.path.exists(artifact_path) and (
+            not os.path.exists(npz_path) or os.path.getmtime(artifact_path) >= os.path.getmtime(npz_path)):
+        from model_artifact import load_artifact
+        return load_artifact(artifact_path)
+    if os.path.exists(npz_path):
+        return NumpyAutoencoder.load(npz_path)
+    import joblib
+    from tensorflow import keras
+    model = keras.models.load_model(os.path.join(model_dir, "autoencoder.keras"))
+    scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+    with open(os.path.join(model_dir, "threshold.txt"), "r") as f:
+        threshold = float(f.read().strip())
+    return NumpyAutoencoder.from_keras(model, scaler, threshold)
+
+
+if __name__ == "__main__":
+    # Convert the keras artifacts without TensorFlow: python numpy_autoencoder.py [model_dir]
+    # Rerun (and commit the result) whenever the model is retrained: the deployed
+    # functions serve autoencoder.npz and only import TensorFlow when it is missing.
+    import joblib
+    from anomaly_rules import FEATURES
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else MODEL_DIR
+    out = os.path.join(model_dir, NPZ_FILE)
+    scaler = joblib.load(os.path.join(model_dir, "scaler.pkl"))
+    with open(os.path.join(model_dir, "threshold.txt"), "r") as f:
+        threshold = float(f.read().strip())
+    NumpyAutoencoder.from_keras_archive(os.path.join(model_dir, "autoencoder.keras"), scaler, threshold,
+                                        FEATURES).save(out)
+    print(f"Saved NumPy autoencoder to {out}")
+    stale = os.path.join(model_dir, ARTIFACT_FILE)
+    if os.path.exists(stale):
+        # Built from the previous model; rerun `python model_artifact.py` to regenerate it.
+        os.remove(stale)
+        print(f"Removed stale {stale}")
@@ -0,0 +1,219 @@
+# sensor_logger.py
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# --- Default RTDB path map (override with the SENSOR_PATH_MAP env var, same JSON shape) ---
+DEFAULT_PATH_MAP = {
+    "sensors": {
+        "solar_generation": "/solar_generation", "solar_voltage": "/sensors/solar_voltage",
+        "solar_current": "/sensors/solar_current", "battery_voltage": "/sensors/battery_voltage",
+        "battery_current": "/sensors/battery_current", "ds18b20_temp": "/sensors/ds18b20_temp",
+        "soc": "/sensors/soc", "dht_temp": "/sensors/dht_temp", "dht_humidity": "/sensors/dht_humidity",
+    },
+    "controls": {
+        "energy_consumption": "/energy_consumption", "Load": "/controls/Load",
+    },
+}
+HISTORY_PATH = "/sensor_history"
+MAX_WORKERS = 8
+
+
+def load_path_map():
+    raw = os.environ.get("SENSOR_PATH_MAP")
+    return json.loads(raw) if raw else DEFAULT_PATH_MAP
+
+
+# --- Firebase-style push IDs, so multi-path updates keep chronological key order ---
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_lock = threading.Lock()
+_last_push_ms = 0
+_last_rand = [0] * 12
+
+
+def generate_push_id(now_ms=None):
+    global _last_push_ms
+    with _push_lock:
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        if now_ms == _last_push_ms:
+            i = 11
+            while i >= 0 and _last_rand[i] == 63:
+                _last_rand[i] = 0
+                i -= 1
+            if i >= 0:
+                _last_rand[i] += 1
+        else:
+            _last_push_ms = now_ms
+            for i in range(12):
+                _last_rand[i] = random.randrange(64)
+        ts_chars = []
+        for _ in range(8):
+            ts_chars.append(PUSH_CHARS[now_ms % 64])
+            now_ms //= 64
+        return "".join(reversed(ts_chars)) + "".join(PUSH_CHARS[r] for r in _last_rand)
+
+
+def push_id_time_ms(key):
+    """Decodes the creation time (ms since epoch) of a push ID, or None for other keys."""
+    if not isinstance(key, str) or len(key) != 20 or any(c not in PUSH_CHARS for c in key):
+        return None
+    ms = 0
+    for c in key[:8]:
+        ms = ms * 64 + PUSH_CHARS.index(c)
+    return ms
+
+
+# --- Reads ---
+def _plan_reads(paths, group_parents):
+    """Maps each distinct RTDB path to fetch onto the (key, child) pairs it serves.
+
+    With group_parents, leaves sharing a non-root parent (e.g. /sensors/*)
+    are served by a single read of that parent.
+    """
+    by_parent = {}
+    for key, path in paths.items():
+        parent, _, child = path.rstrip("/").rpartition("/")
+        by_parent.setdefault(parent, []).append((key, child, path))
+    plan = {}
+    for parent, leaves in by_parent.items():
+        if group_parents and parent and len(leaves) > 1:
+            plan[parent] = [(key, child) for key, child, _ in leaves]
+        else:
+            for key, _, path in leaves:
+                plan[path] = [(key, None)]
+    return plan
+
+
+def read_paths(database, paths, group_parents=True, max_workers=MAX_WORKERS):
+    """Reads {key: path} concurrently with as few round trips as possible."""
+    plan = _plan_reads(paths, group_parents)
+
+    def fetch(path):
+        return path, database.reference(path).get()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(plan)) or 1) as pool:
+        fetched = list(pool.map(fetch, plan))
+
+    readings = {}
+    for path, value in fetched:
+        for key, child in plan[path]:
+            if child is None:
+                readings[key] = value
+            else:
+                readings[key] = value.get(child) if isinstance(value, dict) else None
+    return {key: readings.get(key) for key in paths}
+
+
+def read_snapshots(database, sites, path_map=None, group_parents=True, max_workers=MAX_WORKERS):
+    """Reads sensors and controls for every site in one concurrent fan-out.
+
+    `sites` maps a site id to its path prefix ("" for the root layout).
+    Returns {site: history record}.
+    """
+    path_map = path_map or load_path_map()
+    paths = {}
+    for site, prefix in sites.items():
+        for group, group_paths in path_map.items():
+            for key, path in group_paths.items():
+                paths[(site, group, key)] = prefix + path
+    flat = read_paths(database, paths, group_parents, max_workers)
+    timestamp = datetime.now().isoformat()
+    records = {site: {"timestamp": timestamp} for site in sites}
+    for (site, group, key), value in flat.items():
+        records[site].setdefault(group, {})[key] = value
+    return records
+
+
+def read_snapshot(database, path_map=None, group_parents=True):
+    """Reads the root-layout sensors and controls and returns a history record."""
+    return read_snapshots(database, {None: ""}, path_map, group_parents)[None]
+
+
+# --- Writes ---
+# The /sensor_history push list is still written for the app (it reads the last 24
+# entries); range queries should use the bucketed store in history_store.py.
+def _bucket_updates(records, roots):
+    """Multi-path update entries (relative to /) for each record's raw bucket point."""
+    from history_store import HistoryStore
+    updates = {}
+    for site, record in records.items():
+        path, value = HistoryStore(None, roots[site]).raw_point(record)
+        updates[path.lstrip("/")] = value
+    return updates
+
+
+def _update_rollups(database, records, roots, max_workers=MAX_WORKERS):
+    """Folds each record into its site's day/month rollups; raw points are pruned once a day.
+
+    The raw points themselves travel in the caller's multi-path update
+    (_bucket_updates), so only the rollup transactions cost extra round trips.
+    """
+    from history_store import HistoryStore
+
+    def store(site):
+        history = HistoryStore(database, roots[site])
+        history.rollup(records[site])
+        if datetime.fromisoformat(records[site]["timestamp"]).hour == 0:
+            history.prune()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(records)) or 1) as pool:
+        list(pool.map(store, records))
+
+
+def log_snapshot(database, path_map=None, group_parents=True):
+    """Single-site logging: reads everything, then writes the history entry and raw bucket point in one update."""
+    from history_store import BUCKET_ROOT
+    record = read_snapshot(database, path_map, group_parents=group_parents)
+    roots = {None: BUCKET_ROOT}
+    updates = {f"{HISTORY_PATH.lstrip('/')}/{generate_push_id()}": record}
+    updates.update(_bucket_updates({None: record}, roots))
+    database.reference("/").update(updates)
+    _update_rollups(database, {None: record}, roots)
+    return record
+
+
+def log_sites(database, sites, path_map=None, group_parents=True, max_workers=MAX_WORKERS):
+    """Multi-site logging under /sites/<id>/...; all snapshots and raw points land in one multi-path update."""
+    from history_store import BUCKET_ROOT
+    records = read_snapshots(database, {site: f"/sites/{site}" for site in sites},
+                             path_map, group_parents, max_workers)
+    roots = {site: f"/sites/{site}{BUCKET_ROOT}" for site in sites}
+    updates = {f"sites/{site}{HISTORY_PATH}/{generate_push_id()}": record for site, record in records.items()}
+    updates.update(_bucket_updates(records, roots))
+    database.reference("/").update(updates)
+    _update_rollups(database, records, roots, max_workers)
+    return records
+
+
+def _sequential_snapshot(database, path_map):
+    """The original one-get-per-path logger, kept for benchmarking."""
+    record = {"timestamp": datetime.now().isoformat()}
+    for group, group_paths in path_map.items():
+        record[group] = {key: database.reference(path).get() for key, path in group_paths.items()}
+    return record
+
+
+if __name__ == "__main__":
+    # Offline fan-out benchmark: python sensor_logger.py [latency_ms]
+    import sys
+    from fake_rtdb import FakeDatabase
+
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0
+    data = {"solar_generation": 1.2, "energy_consumption": 0.8, "controls": {"Load": True},
+            "sensors": {k: 1.0 for k in ["solar_voltage", "solar_current", "battery_voltage", "battery_current",
+                                         "ds18b20_temp", "soc", "dht_temp", "dht_humidity"]}}
+    data["sites"] = {f"site{i}": dict(data) for i in range(5)}
+    for name, run in [
+        ("sequential", lambda d: _sequential_snapshot(d, DEFAULT_PATH_MAP)),
+        ("concurrent", lambda d: read_snapshot(d, DEFAULT_PATH_MAP, group_parents=False)),
+        ("grouped+concurrent", lambda d: read_snapshot(d, DEFAULT_PATH_MAP)),
+        ("5 sites, one update", lambda d: log_sites(d, [f"site{i}" for i in range(5)], DEFAULT_PATH_MAP)),
+    ]:
+        database = FakeDatabase(data, latency=latency_ms / 1000)
+        start = time.perf_counter()
+        run(database)
+        print(f"{name:>22}: {1000 * (time.perf_counter() - start):7.1f} ms, {database.calls} round trips")
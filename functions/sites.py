@@ -0,0 +1,32 @@
+# sites.py
+import json
+import os
+
+# Per-installation coordinates and RTDB generation history path.
+DEFAULT_SITES = {
+    "default": {"lat": 18.5204, "lon": 73.8567, "history_path": "history/generation"},  # Pune, India
+}
+SITES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites.json")
+
+_sites = None
+
+
+def load_sites():
+    """Returns {site_id: config}; read once from SITES_CONFIG (a JSON file path) or sites.json."""
+    global _sites
+    if _sites is None:
+        path = os.environ.get("SITES_CONFIG", SITES_FILE)
+        sites = dict(DEFAULT_SITES)
+        if os.path.exists(path):
+            with open(path) as f:
+                sites.update(json.load(f))
+        _sites = sites
+    return _sites
+
+
+def get_sites(site_ids):
+    sites = load_sites()
+    missing = [s for s in site_ids if s not in sites]
+    if missing:
+        raise KeyError(f"Unknown site(s): {', '.join(missing)}")
+    return {s: sites[s] for s in site_ids}
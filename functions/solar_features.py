@@ -0,0 +1,120 @@
+# solar_features.py
+import math
+import numpy as np
+
+from instrumentation import span
+
+HISTORY_HOURS = 168
+ROLL_WINDOW = 24
+
+
+class SolarFeatureEngine:
+    """Recursive feature builder for the PV forecast model.
+
+    The last 168 hourly generation values are kept in a preallocated ring
+    buffer. Every slot is written twice (at i and i + capacity) so the most
+    recent window is always a contiguous slice, which keeps lag lookups and
+    the rolling 24h mean/std O(1) in the length of the history. Lags are
+    positional, exactly like the original DataFrame-based loop: lag_k is the
+    value k rows before the current step.
+    """
+
+    def __init__(self, history_values, capacity=HISTORY_HOURS):
+        self.capacity = capacity
+        self._buf = np.zeros(2 * capacity, dtype=np.float64)
+        self._count = 0
+        values = np.asarray(history_values, dtype=np.float64)[-capacity:]
+        # Left-pad with zeros, as predict_full_day does for short histories.
+        for v in np.concatenate([np.zeros(capacity - len(values)), values]):
+            self.append(v)
+
+    def append(self, value):
+        slot = self._count % self.capacity
+        self._buf[slot] = value
+        self._buf[slot + self.capacity] = value
+        self._count += 1
+
+    def lag(self, k):
+        return self._buf[(self._count - k) % self.capacity]
+
+    def window(self, size=ROLL_WINDOW):
+        start = (self._count - size) % self.capacity
+        return self._buf[start:start + size]
+
+    def rolling_stats(self, size=ROLL_WINDOW):
+        """Mean and sample std of the last `size` values.
+
+        Mirrors pandas' nanmean/nanvar reductions (float64 sum / count) so the
+        result is bit-identical to Series.mean() / Series.std().
+        """
+        w = self.window(size)
+        mean = w.sum(dtype=np.float64) / size
+        if size < 2:
+            return mean, 0.0
+        var = ((mean - w) ** 2).sum(dtype=np.float64) / (size - 1)
+        return mean, np.sqrt(var)
+
+    def features(self, timestamp, irradiance, temp):
+        """Returns the model feature dict for the next step."""
+        mean, std = self.rolling_stats()
+        hour = timestamp.hour
+        dow = timestamp.weekday()
+        return {
+            "irradiance": irradiance, "temp": temp,
+            "lag_1": self.lag(1), "lag_24": self.lag(24), "lag_168": self.lag(168),
+            "roll24_mean": mean, "roll24_std": 0 if math.isnan(std) else std,
+            "hour_sin": np.sin(2 * np.pi * hour / 24), "hour_cos": np.cos(2 * np.pi * hour / 24),
+            "dow_sin": np.sin(2 * np.pi * dow / 7), "dow_cos": np.cos(2 * np.pi * dow / 7),
+        }
+
+
+def recursive_forecast_sites(model, features, histories, forecasts):
+    """Runs the recursive forecast for several sites, batching sites per step.
+
+    histories maps site -> history values and forecasts maps site -> forecast
+    frame ('timestamp', 'irradiance', 'temp', following that site's history).
+    At every horizon step the feature rows of all sites still in their
+    horizon are scored with one model.predict call. Each prediction is clipped
+    at zero and fed back as that site's newest history value.
+    Returns {site: DataFrame(timestamp, predicted_kw)}.
+
+    FastTreeModel gets the raw float64 matrix; any other model (e.g. the
+    sklearn regressor in pv_forecast_model.pkl, fitted with feature names)
+    gets a DataFrame with `features` as columns.
+    """
+    import pandas as pd
+    from tree_engine import FastTreeModel
+
+    named_columns = not isinstance(model, FastTreeModel)
+
+    sites = list(forecasts)
+    engines, inputs, predictions = {}, {}, {}
+    for site in sites:
+        engines[site] = SolarFeatureEngine(histories[site])
+        df = forecasts[site].sort_values(by="timestamp", kind="stable")
+        inputs[site] = (list(df["timestamp"]), df["irradiance"].to_numpy(), df["temp"].to_numpy())
+        predictions[site] = []
+
+    horizon = max((len(inputs[s][0]) for s in sites), default=0)
+    for step in range(horizon):
+        active = [s for s in sites if step < len(inputs[s][0])]
+        with span("feature_build"):
+            batch = np.empty((len(active), len(features)), dtype=np.float64)
+            for j, site in enumerate(active):
+                timestamps, irradiance, temp = inputs[site]
+                row = engines[site].features(timestamps[step], irradiance[step], temp[step])
+                batch[j] = [row[name] for name in features]
+            if named_columns:
+                batch = pd.DataFrame(batch, columns=features)
+        with span("predict"):
+            scores = model.predict(batch)
+        for site, score in zip(active, scores):
+            prediction = max(0, score)
+            predictions[site].append({"timestamp": inputs[site][0][step], "predicted_kw": prediction})
+            engines[site].append(prediction)
+    return {site: pd.DataFrame(predictions[site]) for site in sites}
+
+
+def recursive_forecast(model, features, history_values, forecast_df):
+    """Runs the hour-by-hour recursive forecast for a single series."""
+    return recursive_forecast_sites(model, features, {None: history_values}, {None: forecast_df})[None]
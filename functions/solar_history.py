@@ -0,0 +1,135 @@
+# solar_history.py
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from sensor_logger import push_id_time_ms
+
+HISTORY_HOURS = 168
+HOUR = np.timedelta64(1, "h")
+
+
+def _key_order(key):
+    try:
+        return (0, int(key), "")
+    except ValueError:
+        return (1, 0, key)
+
+
+def _entries(snapshot):
+    """Normalises an RTDB snapshot (list or dict) into key-ordered (key, value) pairs."""
+    if not snapshot:
+        return []
+    if isinstance(snapshot, list):
+        # Sparse arrays come back with None holes for missing keys.
+        return [(str(i), v) for i, v in enumerate(snapshot) if v is not None]
+    return sorted(snapshot.items(), key=lambda kv: _key_order(kv[0]))
+
+
+def _parse_time(value):
+    import pandas as pd
+    if isinstance(value, (int, float)):
+        return np.datetime64(int(value * 1000) if value < 1e11 else int(value), "ms")
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return np.datetime64(ts.to_datetime64(), "ms")
+
+
+class SolarHistoryCache:
+    """Instance-local copy of the last week of a generation series.
+
+    The first call reads the last `hours` entries; later calls only fetch keys
+    after the last one seen (order_by_key().start_at(last_key)). Entries are
+    stamped with their real time when available: a 'timestamp' field on dict
+    entries, else the time encoded in a push ID. Plain array values carry no
+    time, so they are stamped one hour after the previous entry (the first
+    load ends at "now", as the old synthetic timestamps did).
+    """
+
+    def __init__(self, path="history/generation", hours=HISTORY_HOURS):
+        self.path = path
+        self.hours = hours
+        self.last_key = None
+        self.times = np.empty(0, dtype="datetime64[ms]")
+        self.values = np.empty(0, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    def refresh(self, database, now=None):
+        now = np.datetime64(now or datetime.now(), "ms")
+        with self._lock:
+            # Query setters mutate the Query in place, so every read builds its own.
+            def query():
+                return database.reference(self.path).order_by_key()
+
+            if self.last_key is None:
+                entries = _entries(query().limit_to_last(self.hours).get())
+            else:
+                entries = _entries(query().start_at(self.last_key).get())
+                if not entries or entries[0][0] != self.last_key:
+                    # The series was rewritten underneath us; start over.
+                    self.last_key = None
+                    self.times = self.times[:0]
+                    self.values = self.values[:0]
+                    entries = _entries(query().limit_to_last(self.hours).get())
+                else:
+                    entries = entries[1:]
+            if entries:
+                self._append(entries, now)
+        return self
+
+    def _append(self, entries, now):
+        n = len(entries)
+        times = np.empty(n, dtype="datetime64[ms]")
+        values = np.empty(n, dtype=np.float64)
+        prev = self.times[-1] if len(self.times) else now - n * HOUR
+        for i, (key, entry) in enumerate(entries):
+            if isinstance(entry, dict):
+                value = entry.get("generation_kw", entry.get("value"))
+                ts = entry.get("timestamp")
+            else:
+                value, ts = entry, None
+            values[i] = float(value or 0.0)
+            if ts is not None:
+                times[i] = _parse_time(ts)
+            elif push_id_time_ms(key) is not None:
+                times[i] = np.datetime64(push_id_time_ms(key), "ms")
+            else:
+                # No timestamp available: untimed entries are one hour after their predecessor.
+                times[i] = prev + HOUR
+            prev = times[i]
+        self.times = np.concatenate([self.times, times])
+        self.values = np.concatenate([self.values, values])
+        self.last_key = entries[-1][0]
+        keep = self.times > self.times.max() - self.hours * HOUR
+        self.times, self.values = self.times[keep], self.values[keep]
+
+    def hourly_frame(self):
+        """Returns the history on a contiguous hourly grid ending at the latest entry.
+
+        Entries are placed by their real hour (the last one in an hour wins);
+        hours with no data are 0.0, the same value used to pad short histories.
+        """
+        import pandas as pd
+        if len(self.times) == 0:
+            return pd.DataFrame({"timestamp": pd.to_datetime([]), "generation_kw": []})
+        hours = self.times.astype("datetime64[h]")
+        end = hours.max()
+        grid = end - np.arange(self.hours - 1, -1, -1) * HOUR
+        values = np.zeros(self.hours, dtype=np.float64)
+        slots = (hours - grid[0]).astype(np.int64)
+        valid = slots >= 0
+        values[slots[valid]] = self.values[valid]
+        return pd.DataFrame({"timestamp": grid.astype("datetime64[ns]"), "generation_kw": values})
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_history_cache(path="history/generation", hours=HISTORY_HOURS):
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SolarHistoryCache(path, hours)
+        return _caches[path]
@@ -0,0 +1,75 @@
+# stream_inference.py
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dataset import iter_chunks
+from numpy_autoencoder import MODEL_DIR, load_detector
+
+DEFAULT_CHUNKSIZE = 100_000
+
+_detector = None
+
+
+def _init_worker(model_dir):
+    global _detector
+    _detector = load_detector(model_dir)
+
+
+def _score_chunk(X):
+    return _detector.score(X)[1]
+
+
+def iter_scored_chunks(csv_file, features, chunksize=DEFAULT_CHUNKSIZE, workers=1,
+                       model_dir=MODEL_DIR, progress=True, detector=None):
+    """Reads csv_file in fixed-size chunks and yields (chunk_df, X, mse) in file order.
+
+    Only the timestamp and feature columns are read, from the Parquet cache
+    when one exists (see dataset.py). With workers > 1 the
+    chunks are scored in a process pool; at most 2 * workers chunks are in
+    flight so peak memory stays bounded by the chunk size, not the file size.
+    An already loaded detector can be passed to reuse it in the single-process path.
+    """
+    reader = iter_chunks(csv_file, ["timestamp"] + list(features), chunksize)
+    start = time.perf_counter()
+    rows = 0
+
+    def report(n):
+        nonlocal rows
+        rows += n
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"\r  scored {rows:,} rows ({rows / max(elapsed, 1e-9):,.0f} rows/s)", end="", file=sys.stderr)
+
+    if workers <= 1:
+        detector = detector or load_detector(model_dir)
+        for chunk in reader:
+            X = chunk[features].to_numpy(dtype=np.float64)
+            mse = detector.score(X)[1]
+            report(len(chunk))
+            yield chunk, X, mse
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_dir,)) as pool:
+            pending = deque()
+            for chunk in reader:
+                X = chunk[features].to_numpy(dtype=np.float64)
+                pending.append((chunk, X, pool.submit(_score_chunk, X)))
+                if len(pending) >= 2 * workers:
+                    chunk, X, fut = pending.popleft()
+                    report(len(chunk))
+                    yield chunk, X, fut.result()
+            while pending:
+                chunk, X, fut = pending.popleft()
+                report(len(chunk))
+                yield chunk, X, fut.result()
+    if progress:
+        print(file=sys.stderr)
+
+
+def add_stream_args(parser):
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to score chunks")
+    parser.add_argument("--quiet", action="store_true", help="disable progress output")
@@ -0,0 +1,100 @@
+# streaming_scorer.py
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class DeviceState:
+    """Bounded recent history and running residual statistics for one device."""
+
+    def __init__(self, window):
+        self.window = deque(maxlen=window)  # (timestamp_ns, scaled vector, mse)
+        self.last_ts = None
+        self.ewma = None
+        self.count = 0
+        self.alert = False
+        self.lock = threading.Lock()
+
+
+class StreamingScorer:
+    """Scores each device's records exactly once and tracks residual trends.
+
+    Callers may re-post overlapping windows: records at or before the last
+    timestamp already seen for the device are skipped, and only the newly
+    appended ones are scored. Per device the last `window` scaled vectors and
+    residuals are kept, together with an EWMA of the MSE. The alert flag is
+    debounced with hysteresis: it raises when the EWMA exceeds the threshold
+    and clears once it falls below `clear_ratio` * threshold. State is
+    instance-local and capped at `max_devices` (least recently used evicted).
+    """
+
+    def __init__(self, window=256, alpha=0.2, clear_ratio=0.8, max_devices=10_000):
+        self.window = window
+        self.alpha = alpha
+        self.clear_ratio = clear_ratio
+        self.max_devices = max_devices
+        self._devices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, device_id):
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None:
+                state = self._devices[device_id] = DeviceState(self.window)
+                if len(self._devices) > self.max_devices:
+                    self._devices.popitem(last=False)
+            else:
+                self._devices.move_to_end(device_id)
+            return state
+
+    def score(self, device_id, timestamps_ns, X, detector, score_fn=None):
+        """Scores the unseen records of one device.
+
+        timestamps_ns are int64 epoch nanoseconds aligned with the raw feature
+        rows X. Returns (new_mask, mse, ewma, state): mse and ewma cover only
+        the new records, in time order.
+        """
+        state = self._state(device_id)
+        timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+        order = np.argsort(timestamps_ns, kind="stable")
+        with state.lock:
+            if state.last_ts is None:
+                new_mask = np.ones(len(timestamps_ns), dtype=bool)
+            else:
+                new_mask = timestamps_ns > state.last_ts
+            idx = order[new_mask[order]]
+            if len(idx) == 0:
+                return new_mask, np.empty(0), np.empty(0), state
+            X_scaled = detector.transform(X[idx])
+            if score_fn is not None:
+                mse = score_fn(X[idx])
+            else:
+                mse = np.mean(np.square(X_scaled - detector.predict(X_scaled)), axis=1)
+            ewma = np.empty(len(mse))
+            current = state.ewma
+            for i, m in enumerate(mse):
+                current = m if current is None else self.alpha * m + (1 - self.alpha) * current
+                ewma[i] = current
+            state.ewma = current
+            state.count += len(mse)
+            state.last_ts = int(timestamps_ns[idx[-1]])
+            for ts, vec, m in zip(timestamps_ns[idx], X_scaled, mse):
+                state.window.append((int(ts), vec, float(m)))
+            if state.alert:
+                state.alert = current >= self.clear_ratio * detector.threshold
+            else:
+                state.alert = current > detector.threshold
+            return new_mask, mse, ewma, state
+
+    def summary(self, state):
+        residuals = np.array([m for _, _, m in state.window]) if state.window else np.empty(0)
+        return {
+            "records_scored": state.count,
+            "ewma_mse": float(state.ewma) if state.ewma is not None else None,
+            "window_size": len(residuals),
+            "window_mean_mse": float(residuals.mean()) if len(residuals) else None,
+            "window_max_mse": float(residuals.max()) if len(residuals) else None,
+            "alert": bool(state.alert),
+        }
+
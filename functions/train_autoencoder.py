@@ -1,17 +1,19 @@
 # train_autoencoder.py
+import argparse
 import numpy as np
 import pandas as pd
 import os
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-import tensorflow as tf
-from tensorflow import keras
 import joblib
+from numpy_autoencoder import ARTIFACT_FILE, NumpyAutoencoder, export_npz
+from model_artifact import save_autoencoder
+from dataset import load_dataset
 
 # ---- CONFIG ----
 CSV_FILE = "solar_dataset_7000_normal.csv"
 MODEL_DIR = "model_artifacts"
-os.makedirs(MODEL_DIR, exist_ok=True)
+CHECKPOINT_DIR = "training_checkpoints"
 
 FEATURES = [
     "solar_gen","solar_voltage","solar_current","consumption",
@@ -21,89 +23,161 @@ FEATURES = [
 
 TEST_SIZE = 0.2
 RANDOM_STATE = 42
-BATCH_SIZE = 32
+BATCH_SIZE = 256
 EPOCHS = 80   # start here; reduce/increase based on loss behavior
 LATENT_DIM = 6  # bottleneck size (tune)
 VALIDATION_SPLIT = 0.1
-
-# ---- 1. Load data ----
-df = pd.read_csv(CSV_FILE, parse_dates=["timestamp"])
-df = df.sort_values("timestamp").reset_index(drop=True)
-X = df[FEATURES].astype(float).values
-
-# ---- 2. Preprocess: scale features ----
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# ---- 3. Train/val/test split ----
-# For generative anomaly detection it's best to train on "normal" data.
-# If you only have mostly normal synthetic data, split normally:
-X_train, X_test = train_test_split(X_scaled, test_size=TEST_SIZE, random_state=RANDOM_STATE)
-# Further split train -> train/val for early stopping
-X_train, X_val = train_test_split(X_train, test_size=VALIDATION_SPLIT, random_state=RANDOM_STATE)
-
-print("Shapes:", X_train.shape, X_val.shape, X_test.shape)
-
-# ---- 4. Build Autoencoder (simple dense) ----
-input_dim = X_train.shape[1]
-input_layer = keras.Input(shape=(input_dim,))
-
-# Encoder
-x = keras.layers.Dense(64, activation="relu")(input_layer)
-x = keras.layers.Dense(32, activation="relu")(x)
-latent = keras.layers.Dense(LATENT_DIM, activation="relu")(x)
-
-# Decoder
-x = keras.layers.Dense(32, activation="relu")(latent)
-x = keras.layers.Dense(64, activation="relu")(x)
-output_layer = keras.layers.Dense(input_dim, activation="linear")(x)
-
-autoencoder = keras.Model(inputs=input_layer, outputs=output_layer)
-autoencoder.compile(optimizer=keras.optimizers.Adam(learning_rate=1e-3), loss="mse")
-
-autoencoder.summary()
-
-# ---- 5. Train with early stopping ----
-es = keras.callbacks.EarlyStopping(monitor="val_loss", patience=8, restore_best_weights=True)
-history = autoencoder.fit(
-    X_train, X_train,
-    epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
-    validation_data=(X_val, X_val),
-    callbacks=[es],
-    verbose=2
-)
-
-# ---- 6. Determine reconstruction error threshold ----
-# Compute reconstruction MSE on validation set
-X_val_pred = autoencoder.predict(X_val)
-mse_val = np.mean(np.square(X_val - X_val_pred), axis=1)
-
-# Choose threshold: e.g., 95th percentile of val reconstruction error
-threshold = np.percentile(mse_val, 99.5)
-print(f"Validation MSE statistics: mean={mse_val.mean():.6f}, std={mse_val.std():.6f}, 95pct={threshold:.6f}")
-
-# ---- 7. Save artifacts: model, scaler, threshold ----
-model_path = os.path.join(MODEL_DIR, "autoencoder.keras")
-autoencoder.save(model_path)
-
-joblib.dump(scaler, os.path.join(MODEL_DIR, "scaler.pkl"))
-# Save threshold
-with open(os.path.join(MODEL_DIR, "threshold.txt"), "w") as f:
-    f.write(str(threshold))
-
-print("Saved model to:", model_path)
-print("Saved scaler and threshold to:", MODEL_DIR)
-
-# ---- 8. Quick evaluation on test set (print summary) ----
-X_test_pred = autoencoder.predict(X_test)
-mse_test = np.mean(np.square(X_test - X_test_pred), axis=1)
-print(f"Test MSE mean: {mse_test.mean():.6f}, anomalies (mse>{threshold}): {(mse_test>threshold).sum()} / {len(mse_test)}")
-
-# Save MSEs alongside timestamps for inspection
-result_df = df.iloc[X.shape[0]-len(X_test):].copy() if False else pd.DataFrame()  # skip timestamp alignment here
-pd.DataFrame({
-    "mse_test": mse_test
-}).to_csv(os.path.join(MODEL_DIR, "test_mse.csv"), index=False)
-
-print("Training complete.")
+THRESHOLD_PERCENTILE = 99.5
+
+
+# ---- 1. Data ----
+def load_training_data(path):
+    """Loads the training table through the columnar dataset cache (CSV is parsed only once).
+
+    `path` may also be an export_history.py directory; rows with missing
+    readings are dropped.
+    """
+    df = load_dataset(path, columns=["timestamp"] + FEATURES, feature_columns=FEATURES)
+    return df.dropna(subset=FEATURES).sort_values("timestamp").reset_index(drop=True)
+
+
+def configure_threads(intra_op=None, inter_op=None):
+    """Pins TensorFlow's CPU thread pools; must run before any TF op executes."""
+    import tensorflow as tf
+    if intra_op:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    if inter_op:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def make_dataset(X, batch_size, shuffle=False):
+    """tf.data pipeline of (X, X) pairs: cached in memory, shuffled per epoch, prefetched."""
+    import tensorflow as tf
+    X = np.asarray(X, dtype=np.float32)
+    ds = tf.data.Dataset.from_tensor_slices((X, X)).cache()
+    if shuffle:
+        ds = ds.shuffle(len(X), seed=RANDOM_STATE, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+# ---- 2. Model ----
+def build_autoencoder(input_dim, latent_dim=LATENT_DIM):
+    """Simple dense autoencoder: 64-32-latent-32-64."""
+    from tensorflow import keras
+    input_layer = keras.Input(shape=(input_dim,))
+
+    # Encoder
+    x = keras.layers.Dense(64, activation="relu")(input_layer)
+    x = keras.layers.Dense(32, activation="relu")(x)
+    latent = keras.layers.Dense(latent_dim, activation="relu")(x)
+
+    # Decoder
+    x = keras.layers.Dense(32, activation="relu")(latent)
+    x = keras.layers.Dense(64, activation="relu")(x)
+    output_layer = keras.layers.Dense(input_dim, activation="linear")(x)
+
+    autoencoder = keras.Model(inputs=input_layer, outputs=output_layer)
+    autoencoder.compile(optimizer=keras.optimizers.Adam(learning_rate=1e-3), loss="mse")
+    return autoencoder
+
+
+# ---- 3. Training ----
+def train(data_file=CSV_FILE, model_dir=MODEL_DIR, batch_size=BATCH_SIZE, epochs=EPOCHS,
+          latent_dim=LATENT_DIM, checkpoint_dir=CHECKPOINT_DIR, intra_op_threads=None,
+          inter_op_threads=None, verbose=2):
+    """Trains the autoencoder and writes model, scaler, threshold and .npz artifacts.
+
+    Training state is backed up to checkpoint_dir every epoch, so rerunning
+    after an interruption resumes from the last completed epoch. Returns the
+    chosen threshold.
+    """
+    configure_threads(intra_op_threads, inter_op_threads)
+    from tensorflow import keras
+    os.makedirs(model_dir, exist_ok=True)
+
+    df = load_training_data(data_file)
+    X = df[FEATURES].astype(float).values
+
+    # Preprocess: scale features
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Train/val/test split
+    # For generative anomaly detection it's best to train on "normal" data.
+    # If you only have mostly normal synthetic data, split normally:
+    # (split row indices so test errors can be matched back to their timestamps)
+    idx_train, idx_test = train_test_split(np.arange(len(X_scaled)), test_size=TEST_SIZE, random_state=RANDOM_STATE)
+    # Further split train -> train/val for early stopping
+    idx_train, idx_val = train_test_split(idx_train, test_size=VALIDATION_SPLIT, random_state=RANDOM_STATE)
+    X_train, X_val, X_test = X_scaled[idx_train], X_scaled[idx_val], X_scaled[idx_test]
+    print("Shapes:", X_train.shape, X_val.shape, X_test.shape)
+
+    autoencoder = build_autoencoder(X_train.shape[1], latent_dim)
+    autoencoder.summary()
+
+    # Train with early stopping; BackupAndRestore makes interrupted runs resumable
+    callbacks = [
+        keras.callbacks.BackupAndRestore(os.path.join(checkpoint_dir, "backup")),
+        keras.callbacks.ModelCheckpoint(os.path.join(checkpoint_dir, "best.keras"), monitor="val_loss", save_best_only=True),
+        keras.callbacks.EarlyStopping(monitor="val_loss", patience=8, restore_best_weights=True),
+    ]
+    autoencoder.fit(
+        make_dataset(X_train, batch_size, shuffle=True),
+        epochs=epochs,
+        validation_data=make_dataset(X_val, batch_size),
+        callbacks=callbacks,
+        verbose=verbose
+    )
+
+    # Reconstruction error for validation and test in a single predict call
+    X_eval = np.concatenate([X_val, X_test])
+    X_eval_pred = autoencoder.predict(X_eval, batch_size=max(batch_size, 4096), verbose=0)
+    mse_eval = np.mean(np.square(X_eval - X_eval_pred), axis=1)
+    mse_val, mse_test = mse_eval[:len(X_val)], mse_eval[len(X_val):]
+
+    # Choose threshold: high percentile of val reconstruction error
+    threshold = np.percentile(mse_val, THRESHOLD_PERCENTILE)
+    print(f"Validation MSE statistics: mean={mse_val.mean():.6f}, std={mse_val.std():.6f}, p{THRESHOLD_PERCENTILE}={threshold:.6f}")
+
+    # Save artifacts: model, scaler, threshold
+    model_path = os.path.join(model_dir, "autoencoder.keras")
+    autoencoder.save(model_path)
+    joblib.dump(scaler, os.path.join(model_dir, "scaler.pkl"))
+    with open(os.path.join(model_dir, "threshold.txt"), "w") as f:
+        f.write(str(threshold))
+    # Compact NumPy artifact used by the serving path (no TensorFlow needed at inference)
+    npz_path = export_npz(autoencoder, scaler, threshold, os.path.join(model_dir, "autoencoder.npz"), FEATURES)
+    artifact_path = save_autoencoder(NumpyAutoencoder.load(npz_path), os.path.join(model_dir, ARTIFACT_FILE))
+    print("Saved model to:", model_path, npz_path, "and", artifact_path)
+    print("Saved scaler and threshold to:", model_dir)
+
+    # Quick evaluation on test set (print summary)
+    print(f"Test MSE mean: {mse_test.mean():.6f}, anomalies (mse>{threshold}): {(mse_test>threshold).sum()} / {len(mse_test)}")
+    # Save MSEs alongside timestamps for inspection
+    pd.DataFrame({
+        "timestamp": df["timestamp"].to_numpy()[idx_test],
+        "mse_test": mse_test
+    }).sort_values("timestamp").to_csv(os.path.join(model_dir, "test_mse.csv"), index=False)
+
+    print("Training complete.")
+    return threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the sensor anomaly autoencoder.")
+    parser.add_argument("data_file", nargs="?", default=CSV_FILE, help="CSV, Parquet or Feather training data, or an export_history.py directory")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--latent-dim", type=int, default=LATENT_DIM)
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--intra-op-threads", type=int, default=None)
+    parser.add_argument("--inter-op-threads", type=int, default=None)
+    args = parser.parse_args()
+    train(args.data_file, args.model_dir, args.batch_size, args.epochs, args.latent_dim,
+          args.checkpoint_dir,
+          args.intra_op_threads, args.inter_op_threads)
+
+
+if __name__ == "__main__":
+    main()
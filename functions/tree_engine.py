@@ -0,0 +1,195 @@
+# tree_engine.py
+import os
+
+import numpy as np
+
+# TREE_ENGINE=booster (default) calls the raw LightGBM Booster on a float64 array; "numpy"
+# evaluates flattened trees with NumPy (slower than the Booster at every batch size measured,
+# kept as a dependency-free reference); "wrapper" keeps the original model.predict.
+TREE_ENGINE = os.environ.get("TREE_ENGINE", "booster")
+K_ZERO_THRESHOLD = 1e-35  # LightGBM's kZeroThreshold
+MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+OUTPUT_TRANSFORMS = {
+    "regression": None, "regression_l1": None, "huber": None, "fair": None, "quantile": None, "mape": None,
+    "poisson": np.exp, "gamma": np.exp, "tweedie": np.exp,
+}
+
+
+class CompiledTrees:
+    """A LightGBM regression ensemble flattened into NumPy arrays.
+
+    Internal nodes of all trees share one set of arrays; a child index >= 0
+    is another internal node and a negative one is ~leaf_index. Rows walk all
+    trees at once, one tree level per iteration, using LightGBM's numerical
+    decision rule (missing-value handling included). Tree outputs are summed
+    in tree order with cumsum, like LightGBM, so results match Booster.predict
+    bit for bit.
+    """
+
+    def __init__(self, dump):
+        if dump.get("num_class", 1) != 1:
+            raise ValueError("only single-output models are supported")
+        params = dump.get("objective", "regression").split()
+        objective = params[0]
+        if objective not in OUTPUT_TRANSFORMS or "sqrt" in params:
+            raise ValueError(f"unsupported objective '{' '.join(params)}'")
+        self.transform = OUTPUT_TRANSFORMS[objective]
+        self.average_output = bool(dump.get("average_output", False))
+        self.num_features = dump["max_feature_idx"] + 1
+
+        feature, threshold, missing, default_left, left, right, leaves, roots = [], [], [], [], [], [], [], []
+
+        def visit(node):
+            if "leaf_value" in node:
+                leaves.append(node["leaf_value"])
+                return ~(len(leaves) - 1)
+            if node.get("decision_type", "<=") != "<=":
+                raise ValueError("categorical splits are not supported")
+            i = len(feature)
+            feature.append(node["split_feature"])
+            threshold.append(node["threshold"])
+            missing.append(MISSING_TYPES[node.get("missing_type", "None")])
+            default_left.append(bool(node.get("default_left", True)))
+            left.append(0)
+            right.append(0)
+            left[i] = visit(node["left_child"])
+            right[i] = visit(node["right_child"])
+            return i
+
+        for tree in dump["tree_info"]:
+            if tree.get("is_linear"):
+                raise ValueError("linear trees are not supported")
+            roots.append(visit(tree["tree_structure"]))
+
+        self.feature = np.array(feature, dtype=np.intp)
+        self.threshold = np.array(threshold, dtype=np.float64)
+        self.missing = np.array(missing, dtype=np.int8)
+        self.default_left = np.array(default_left, dtype=bool)
+        self.left = np.array(left, dtype=np.intp)
+        self.right = np.array(right, dtype=np.intp)
+        self.leaf_value = np.array(leaves, dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.intp)
+
+    @classmethod
+    def from_booster(cls, booster):
+        return cls(booster.dump_model())
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"expected {self.num_features} features, got {X.shape[1]}")
+        idx = np.tile(self.roots, (len(X), 1))
+        rows, trees = np.nonzero(idx >= 0)
+        while len(rows):
+            node = idx[rows, trees]
+            x = X[rows, self.feature[node]]
+            missing = self.missing[node]
+            nan = np.isnan(x)
+            x = np.where(nan & (missing != 2), 0.0, x)
+            use_default = ((missing == 1) & (np.abs(x) <= K_ZERO_THRESHOLD)) | ((missing == 2) & nan)
+            go_left = np.where(use_default, self.default_left[node], x <= self.threshold[node])
+            child = np.where(go_left, self.left[node], self.right[node])
+            idx[rows, trees] = child
+            internal = child >= 0
+            rows, trees = rows[internal], trees[internal]
+        out = np.cumsum(self.leaf_value[~idx], axis=1)[:, -1] if idx.shape[1] else np.zeros(len(X))
+        if self.average_output:
+            out = out / idx.shape[1]
+        return self.transform(out) if self.transform is not None else out
+
+
+class FastTreeModel:
+    """Drop-in model.predict for LightGBM models that skips the sklearn/pandas layers.
+
+    Accepts an LGBMRegressor or a Booster. Inputs (DataFrame or array) are
+    converted once to a contiguous float64 matrix in column order and
+    evaluated with Booster.predict, or with CompiledTrees when
+    TREE_ENGINE=numpy and the model can be compiled.
+    """
+
+    def __init__(self, model, engine=TREE_ENGINE):
+        self.model = model
+        self.booster = getattr(model, "booster_", model)
+        self.engine = engine
+        self.compiled = None
+        if engine == "numpy":
+            try:
+                self.compiled = CompiledTrees.from_booster(self.booster)
+            except ValueError as e:
+                print(f"Tree compilation unavailable ({e}); using Booster.predict")
+                self.engine = "booster"
+
+    def predict(self, X):
+        if self.engine == "wrapper":
+            return self.model.predict(X)
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.booster.predict(X)
+
+    def __getattr__(self, name):
+        if name == "model":  # not set yet (e.g. during unpickling)
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def is_lightgbm(model):
+    """True for a fitted LightGBM sklearn model or a raw lgb.Booster."""
+    if hasattr(model, "booster_"):
+        return True
+    try:
+        import lightgbm as lgb
+    except ImportError:
+        return False
+    return isinstance(model, lgb.Booster)
+
+
+def wrap(obj, engine=TREE_ENGINE):
+    """Wraps a LightGBM model, or the 'model' of a {"model", "features"} dict, in FastTreeModel.
+
+    Anything else (e.g. the sklearn GradientBoostingRegressor in
+    pv_forecast_model.pkl) is returned unchanged.
+    """
+    if isinstance(obj, dict) and "model" in obj:
+        return dict(obj, model=wrap(obj["model"], engine))
+    return FastTreeModel(obj, engine) if is_lightgbm(obj) else obj
+
+
+def max_abs_difference(model, X, engine="numpy"):
+    """Largest |fast - wrapper| prediction difference on X (0.0 when they match exactly)."""
+    fast = FastTreeModel(model, engine)
+    return float(np.max(np.abs(fast.predict(X) - np.asarray(model.predict(X), dtype=np.float64)), initial=0.0))
+
+
+if __name__ == "__main__":
+    # Check and time against the wrapper: python tree_engine.py [model.pkl ...]
+    import pickle
+    import sys
+    import time
+
+    rng = np.random.default_rng(0)
+    for path in sys.argv[1:] or ["load_forecasting_model.pkl", "pv_forecast_model.pkl"]:
+        with open(path, "rb") as f:
+            obj = pickle.load(f)
+        model = obj["model"] if isinstance(obj, dict) else obj
+        if not is_lightgbm(model):
+            print(f"{path}: {type(model).__name__} is not a LightGBM model; served as-is")
+            continue
+        fast = FastTreeModel(model, "numpy")
+        compiled = fast.compiled or CompiledTrees.from_booster(fast.booster)
+        # Probe values around the split thresholds of each feature, with some NaNs.
+        X = rng.normal(size=(5000, compiled.num_features))
+        for j in range(compiled.num_features):
+            cuts = compiled.threshold[compiled.feature == j]
+            if len(cuts):
+                X[:, j] = rng.choice(cuts, len(X)) + rng.choice([-1e-9, 0.0, 1e-9], len(X))
+        X[rng.random(X.shape) < 0.01] = np.nan
+        print(f"{path}: {len(compiled.roots)} trees, max |fast - wrapper| = {max_abs_difference(model, X):.3g}")
+        for name, fn in [("wrapper", model.predict), ("booster", fast.booster.predict), ("numpy", fast.predict)]:
+            row = X[:1]
+            start = time.perf_counter()
+            for _ in range(200):
+                fn(row)
+            print(f"  {name:>8}: {1e6 * (time.perf_counter() - start) / 200:8.1f} us per single-row predict")
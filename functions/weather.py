@@ -0,0 +1,180 @@
+# weather.py
+import abc
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+HOURLY_FIELDS = "temperature_2m,direct_radiation"
+
+
+def payload_to_frame(payload, start_day, days=1):
+    """Converts an Open-Meteo style payload into the solar pipeline's forecast frame."""
+    import pandas as pd
+    data = payload["hourly"]
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(data['time']),
+        'irradiance': [float(e or 0.0) for e in data['direct_radiation']],
+        'temp': [float(e or 0.0) for e in data['temperature_2m']]
+    })
+    last_day = start_day + timedelta(days=days - 1)
+    day_col = df['timestamp'].dt.date
+    return df[(day_col >= start_day) & (day_col <= last_day)].reset_index(drop=True)
+
+
+class WeatherProvider(abc.ABC):
+    """Source of hourly irradiance/temperature forecasts."""
+
+    @abc.abstractmethod
+    def payload(self, lat, lon, start_day, days=1):
+        """Returns an Open-Meteo style {"hourly": {...}} payload covering `days` from `start_day`."""
+
+    def hourly(self, lat, lon, start_day, days=1):
+        return payload_to_frame(self.payload(lat, lon, start_day, days), start_day, days)
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo client with a keep-alive session and a two-level TTL cache.
+
+    Responses are cached in memory and on disk, keyed by (lat, lon, day, days).
+    A fresh entry (younger than `ttl`) is returned directly. A stale entry
+    (younger than `max_stale`) is returned immediately while one background
+    thread refreshes it (stale-while-revalidate). Anything older is fetched
+    synchronously.
+    """
+
+    def __init__(self, ttl=3600, max_stale=6 * 3600, timeout=(3.05, 10),
+                 cache_dir=os.path.join(tempfile.gettempdir(), "weather_cache")):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self._memory = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def _key(self, lat, lon, start_day, days):
+        return (round(lat, 4), round(lon, 4), start_day.isoformat(), days)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, "{}_{}_{}_{}.json".format(*key))
+
+    def _fetch(self, key):
+        lat, lon, start, days = key
+        end = (date.fromisoformat(start) + timedelta(days=days - 1)).isoformat()
+        params = {"latitude": lat, "longitude": lon, "hourly": HOURLY_FIELDS, "start_date": start, "end_date": end}
+        response = self.session.get(OPEN_METEO_URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        entry = (time.time(), response.json())
+        with self._lock:
+            self._memory[key] = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self._disk_path(key) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"fetched_at": entry[0], "payload": entry[1]}, f)
+            os.replace(tmp, self._disk_path(key))
+        except OSError:
+            pass
+        return entry
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None:
+            try:
+                with open(self._disk_path(key)) as f:
+                    raw = json.load(f)
+                entry = (raw["fetched_at"], raw["payload"])
+                with self._lock:
+                    self._memory[key] = entry
+            except (OSError, ValueError, KeyError):
+                return None
+        return entry
+
+    def _revalidate(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._fetch(key)
+            except Exception as e:
+                print(f"Weather revalidation failed for {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def payload(self, lat, lon, start_day, days=1):
+        key = self._key(lat, lon, start_day, days)
+        entry = self._cached(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.max_stale:
+                self._revalidate(key)
+                return entry[1]
+        return self._fetch(key)[1]
+
+
+class FixtureWeatherProvider(WeatherProvider):
+    """Serves a saved Open-Meteo JSON response for offline runs and benchmarks.
+
+    The fixture's days are re-dated onto the requested ones, repeating them in
+    order when the fixture is shorter than `days`, so the pipeline always gets
+    a full horizon.
+    """
+
+    def __init__(self, path):
+        with open(path) as f:
+            self._payload = json.load(f)
+
+    def payload(self, lat, lon, start_day, days=1):
+        source = self._payload["hourly"]
+        fixture_days = {}
+        for i, t in enumerate(source["time"]):
+            fixture_days.setdefault(t[:10], []).append(i)
+        if not fixture_days:
+            raise ValueError("weather fixture has no hourly data")
+        groups = list(fixture_days.values())
+        hourly = {field: [] for field in source}
+        for n in range(days):
+            rows = groups[n % len(groups)]
+            target = (start_day + timedelta(days=n)).isoformat()
+            for field, values in source.items():
+                if field == "time":
+                    hourly[field].extend(target + values[i][10:] for i in rows)
+                else:
+                    hourly[field].extend(values[i] for i in rows)
+        return {"hourly": hourly}
+
+
+_provider = None
+
+
+def get_provider():
+    """Returns the process-wide provider; WEATHER_FIXTURE=<file.json> selects the offline fixture."""
+    global _provider
+    if _provider is None:
+        fixture = os.environ.get("WEATHER_FIXTURE")
+        _provider = FixtureWeatherProvider(fixture) if fixture else OpenMeteoProvider(
+            ttl=float(os.environ.get("WEATHER_TTL_SEC", "3600")))
+    return _provider
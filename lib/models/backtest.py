@@ -0,0 +1,217 @@
+# backtest.py
+# Rolling-origin backtests for the load and PV forecasting models.
+#
+# An origin is the last observed timestamp before a forecast. For every
+# origin the model forecasts the following horizon exactly as it would in
+# production (predict_for_tomorrow for load, the predict_full_day recursion
+# for PV), and the forecasts are compared with what was actually recorded.
+# Origins are scored in chunks spread over a process pool; errors are
+# aggregated into MAE/MAPE per hour of day.
+#
+#     python backtest.py load modeldata.csv --model load_forecasting_model.pkl --first-origin 2024-01-01
+#     python backtest.py pv pv_history.csv --model ../../functions/pv_forecast_model.pkl --workers 8
+#
+# The model is evaluated as-is (no refitting per origin), so only origins
+# after the model's training period measure out-of-sample skill.
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from model import forecast_batch, load_model
+# model.py puts the functions/ directory on sys.path.
+from dataset import load_dataset
+from solar_features import HISTORY_HOURS, recursive_forecast_sites
+from tree_engine import wrap
+
+LOAD_TARGET = 'load_demand_mw'
+PV_TARGET = 'generation_kw'
+ORIGINS_PER_CHUNK = 64
+
+_worker = {}
+
+
+# ---- Origins ----
+def rolling_origins(timestamps, horizon, stride='24h', first_origin=None, min_history=pd.Timedelta(0)):
+    """Origins every `stride`, leaving `min_history` before and a full `horizon` after each one."""
+    timestamps = pd.DatetimeIndex(timestamps)
+    first = timestamps.min() + min_history
+    if first_origin is not None:
+        first = max(first, pd.Timestamp(first_origin))
+    return pd.date_range(first, timestamps.max() - horizon, freq=stride)
+
+
+def _chunks(origins, size=ORIGINS_PER_CHUNK):
+    return [origins[i:i + size] for i in range(0, len(origins), size)]
+
+
+# ---- Workers ----
+def _init_worker(kind, model_path, data=None):
+    """Loads the model once per process; PV workers also keep the hourly input arrays."""
+    if kind == 'pv':
+        with open(model_path, 'rb') as f:
+            _worker['model'] = wrap(pickle.load(f))
+        _worker['data'] = data
+    else:
+        _worker['model'] = wrap(load_model(model_path))
+
+
+def _load_chunk(origins, periods, freq):
+    out = forecast_batch(_worker['model'], origins, periods, freq)
+    return out[['start', 'step', 'timestamp', 'predicted_load_mw']].rename(columns={'predicted_load_mw': 'predicted'})
+
+
+def _pv_chunk(positions, horizon):
+    """One recursive multi-site run where every origin in the chunk is a 'site'."""
+    model_dict = _worker['model']
+    timestamps, generation, irradiance, temp = _worker['data']
+    histories, forecasts = {}, {}
+    for i in positions:
+        histories[i] = generation[i - HISTORY_HOURS + 1:i + 1]
+        window = slice(i + 1, i + 1 + horizon)
+        forecasts[i] = pd.DataFrame({'timestamp': timestamps[window], 'irradiance': irradiance[window],
+                                     'temp': temp[window]})
+    predictions = recursive_forecast_sites(model_dict['model'], model_dict['features'], histories, forecasts)
+    frames = []
+    for i, df in predictions.items():
+        frames.append(pd.DataFrame({'start': timestamps[i], 'step': np.arange(1, len(df) + 1, dtype=np.int16),
+                                    'timestamp': df['timestamp'].to_numpy(), 'predicted': df['predicted_kw'].to_numpy()}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class _LoadTask:
+    """Picklable partial of _load_chunk for the process pool."""
+
+    def __init__(self, periods, freq):
+        self.periods, self.freq = periods, freq
+
+    def __call__(self, origins):
+        return _load_chunk(origins, self.periods, self.freq)
+
+
+class _PVTask:
+    def __init__(self, horizon):
+        self.horizon = horizon
+
+    def __call__(self, positions):
+        return _pv_chunk(positions, self.horizon)
+
+
+def _run_chunks(fn, chunks, workers, initargs):
+    if workers <= 1:
+        _init_worker(*initargs)
+        return [fn(chunk) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(fn, chunks))
+
+
+# ---- Backtests ----
+def backtest_load(df, model_path, periods=48, freq='30min', stride='24h', first_origin=None, workers=1):
+    """Day-ahead load backtest; returns rows of start, step, timestamp, predicted, actual."""
+    actual = df.groupby('timestamp')[LOAD_TARGET].mean()
+    origins = rolling_origins(actual.index, periods * pd.Timedelta(freq), stride, first_origin)
+    chunks = _chunks(origins.to_numpy())
+    results = _run_chunks(_LoadTask(periods, freq), chunks, workers, ('load', model_path))
+    return _attach_actuals(results, actual)
+
+
+def backtest_pv(df, model_path, horizon=24, stride='24h', first_origin=None, workers=1):
+    """Recursive PV backtest on an hourly table of timestamp, generation_kw, irradiance and temp.
+
+    Recorded weather stands in for the forecast, so errors measure the model
+    and the recursion, not the weather provider. Missing generation hours feed
+    the recursion as 0.0 (as SolarHistoryCache.hourly_frame does) but are not
+    scored; origins whose horizon has missing weather are skipped.
+    """
+    hourly = df.groupby('timestamp')[[PV_TARGET, 'irradiance', 'temp']].mean().asfreq('h')
+    timestamps = hourly.index.to_numpy()
+    origins = rolling_origins(hourly.index, pd.Timedelta(hours=horizon), stride, first_origin,
+                              min_history=pd.Timedelta(hours=HISTORY_HOURS - 1))
+    positions = hourly.index.get_indexer(origins)
+    positions = positions[positions >= 0]
+    irradiance = hourly['irradiance'].to_numpy(dtype=float)
+    temp = hourly['temp'].to_numpy(dtype=float)
+    # Hours with missing weather anywhere in (origin, origin + horizon] rule the origin out.
+    gaps = np.concatenate([[0], np.cumsum(np.isnan(irradiance) | np.isnan(temp))])
+    positions = positions[gaps[positions + 1 + horizon] == gaps[positions + 1]]
+    data = (timestamps, hourly[PV_TARGET].fillna(0.0).to_numpy(dtype=float), irradiance, temp)
+    results = _run_chunks(_PVTask(horizon), _chunks(positions), workers, ('pv', model_path, data))
+    return _attach_actuals(results, hourly[PV_TARGET])
+
+
+def _attach_actuals(results, actual):
+    if not results:
+        return pd.DataFrame(columns=['start', 'step', 'timestamp', 'predicted', 'actual'])
+    out = pd.concat(results, ignore_index=True)
+    out['actual'] = actual.reindex(out['timestamp']).to_numpy()
+    return out[out['actual'].notna()].reset_index(drop=True)
+
+
+# ---- Metrics ----
+def hourly_errors(results):
+    """MAE and MAPE (%) per hour of day; MAPE skips rows whose actual value is 0."""
+    err = (results['predicted'] - results['actual']).abs()
+    nonzero = results['actual'] != 0
+    ape = (err[nonzero] / results['actual'][nonzero].abs()) * 100
+    hour = results['timestamp'].dt.hour
+    table = pd.DataFrame({
+        'n': err.groupby(hour).size(),
+        'mae': err.groupby(hour).mean(),
+        'mape_pct': ape.groupby(hour[nonzero]).mean(),
+    })
+    table.index.name = 'hour'
+    return table
+
+
+def summary(results):
+    err = (results['predicted'] - results['actual']).abs()
+    nonzero = results['actual'] != 0
+    return {
+        'origins': int(results['start'].nunique()), 'rows': len(results), 'mae': float(err.mean()),
+        'mape_pct': float((err[nonzero] / results['actual'][nonzero].abs()).mean() * 100) if nonzero.any() else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the load or PV forecasting model.")
+    parser.add_argument('kind', choices=['load', 'pv'])
+    parser.add_argument('data_file')
+    parser.add_argument('--model', required=True, help="load: joblib model; pv: pickle with 'model' and 'features'")
+    parser.add_argument('--stride', default='24h', help="time between origins")
+    parser.add_argument('--first-origin', default=None)
+    parser.add_argument('--horizon', type=int, default=None, help="steps per forecast (load: 48 x 30min, pv: 24 x 1h)")
+    parser.add_argument('--timestamp-format', default=None, help="e.g. '%%d-%%m-%%Y %%H:%%M' for modeldata.csv")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', default=None, help="CSV for the per-hour table (default: <kind>_backtest_hourly.csv)")
+    args = parser.parse_args()
+
+    df = load_dataset(args.data_file, timestamp_format=args.timestamp_format)
+    start = time.perf_counter()
+    if args.kind == 'load':
+        results = backtest_load(df, args.model, args.horizon or 48, stride=args.stride,
+                                first_origin=args.first_origin, workers=args.workers)
+    else:
+        results = backtest_pv(df, args.model, args.horizon or 24, stride=args.stride,
+                              first_origin=args.first_origin, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    if results.empty:
+        sys.exit("No origins with a full horizon of actuals; check --first-origin/--stride.")
+
+    table = hourly_errors(results)
+    output = args.output or f"{args.kind}_backtest_hourly.csv"
+    table.to_csv(output)
+    print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+    stats = summary(results)
+    mape = 'n/a' if stats['mape_pct'] is None else f"{stats['mape_pct']:.2f}%"
+    print(f"\n{stats['origins']:,} origins, {stats['rows']:,} forecasts in {elapsed:.1f}s "
+          f"({args.workers} workers): MAE {stats['mae']:.3f}, MAPE {mape}")
+    print(f"Per-hour errors saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,60 @@
 # forecast_pipeline_final_v3.py
 
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 import lightgbm as lgb
 import joblib
 
+# Shared columnar dataset loader lives with the Cloud Functions code.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'functions'))
+from dataset import load_dataset
+from model_artifact import artifact_path, save_lightgbm
+
 # FIX FOR THE TKINTER ERROR
 import matplotlib
 
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 
+FEATURES = ['hour', 'day_of_week', 'day_of_month', 'month', 'quarter', 'year', 'is_weekend']
+
+
+def calendar_features(timestamps):
+    """Builds the model's calendar columns from datetime64 values with NumPy arithmetic.
+
+    Accepts any array-like of naive timestamps (ndarray, Series, DatetimeIndex,
+    any shape) and returns a DataFrame of FEATURES with compact integer dtypes
+    (int8, year int16), one row per timestamp in flattened order.
+    """
+    ts = np.asarray(timestamps, dtype='datetime64[ns]').ravel()
+    days = ts.astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    month = (months.astype(np.int64) % 12 + 1).astype(np.int8)
+    # 1970-01-01 was a Thursday (Monday=0 .. Sunday=6).
+    day_of_week = ((days.astype(np.int64) + 3) % 7).astype(np.int8)
+    return pd.DataFrame({
+        'hour': ((ts - days) // np.timedelta64(1, 'h')).astype(np.int8),
+        'day_of_week': day_of_week,
+        'day_of_month': ((days - months.astype('datetime64[D]')).astype(np.int64) + 1).astype(np.int8),
+        'month': month,
+        'quarter': ((month - 1) // 3 + 1).astype(np.int8),
+        'year': (months.astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int16),
+        'is_weekend': (day_of_week >= 5).astype(np.int8),
+    }, columns=FEATURES)
+
 
 def prepare_data(file_path):
     """Loads data, handles the specific date format, and creates features."""
     print(f"Loading data from {file_path}...")
-    df = pd.read_csv(file_path)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%d-%m-%Y %H:%M')
+    # Parsed once into a typed Parquet cache; later runs skip CSV and date parsing.
+    df = load_dataset(file_path, timestamp_format='%d-%m-%Y %H:%M')
     df = df.sort_values('timestamp').reset_index(drop=True)
 
     # Feature Engineering
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['day_name'] = df['timestamp'].dt.day_name()
-    df['day_of_month'] = df['timestamp'].dt.day
-    df['month'] = df['timestamp'].dt.month
-    df['quarter'] = df['timestamp'].dt.quarter
-    df['year'] = df['timestamp'].dt.year
-    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
+    df[FEATURES] = calendar_features(df['timestamp'])
 
     print("Data preparation complete.")
     return df
@@ -67,38 +95,53 @@ def plot_forecast_for_tomorrow(forecast_df, image_path='tomorrow_forecast_plot.p
 def train_and_save_model(df, model_path='load_forecasting_model.pkl'):
     """Trains and saves the LightGBM model."""
     print("\n--- Model Training ---")
-    features = ['hour', 'day_of_week', 'day_of_month', 'month', 'quarter', 'year', 'is_weekend']
     target = 'load_demand_mw'
-    X = df[features]
+    X = df[FEATURES]
     y = df[target]
 
     model = lgb.LGBMRegressor(objective='regression_l1', n_estimators=1000, learning_rate=0.05, num_leaves=31)
     model.fit(X, y)
     joblib.dump(model, model_path)
-    print(f"Model training complete. Model saved to {model_path}")
+    # Native LightGBM text + header, served by the Cloud Functions registry.
+    artifact = save_lightgbm(model, artifact_path(model_path), FEATURES)
+    print(f"Model training complete. Model saved to {model_path} and {artifact}")
     return model_path
 
 
-def predict_for_tomorrow(model_path, last_timestamp):
-    """Loads the model and predicts the load for the next 24 hours at 30-minute intervals."""
-    print("\n--- Generating Forecast for Tomorrow ---")
-    model = joblib.load(model_path)
+def load_model(model):
+    """Returns `model` itself, or the model unpickled from it when given a path."""
+    return joblib.load(model) if isinstance(model, (str, os.PathLike)) else model
+
 
-    future_dates = pd.date_range(start=last_timestamp, periods=49, freq='30min')[1:]
-    future_df = pd.DataFrame({'timestamp': future_dates})
+def forecast_batch(model, start_timestamps, periods=48, freq='30min'):
+    """Scores `periods` steps of `freq` after every start timestamp in one predict call.
 
-    future_df['hour'] = future_df['timestamp'].dt.hour
-    future_df['day_of_week'] = future_df['timestamp'].dt.dayofweek
+    `model` is a fitted model (or a path, loaded once). Returns a long
+    DataFrame with columns start, step (1..periods), timestamp, the calendar
+    FEATURES and predicted_load_mw, ordered by start then step.
+    """
+    model = load_model(model)
+    starts = np.asarray(start_timestamps, dtype='datetime64[ns]').ravel()
+    step = np.timedelta64(pd.Timedelta(freq).value, 'ns')
+    offsets = np.arange(1, periods + 1) * step
+    grid = (starts[:, None] + offsets).ravel()
+
+    out = calendar_features(grid)
+    out.insert(0, 'timestamp', grid)
+    out.insert(0, 'step', np.tile(np.arange(1, periods + 1, dtype=np.int16), len(starts)))
+    out.insert(0, 'start', np.repeat(starts, periods))
+    out['predicted_load_mw'] = model.predict(out[FEATURES]) if len(out) else np.empty(0)
+    return out
+
+
+def predict_for_tomorrow(model, last_timestamp, periods=48, freq='30min'):
+    """Predicts the load for the next 24 hours (by default) at 30-minute intervals.
+
+    `model` may be a fitted model or the path it was saved to.
+    """
+    print("\n--- Generating Forecast for Tomorrow ---")
+    future_df = forecast_batch(model, [last_timestamp], periods, freq).drop(columns=['start', 'step'])
     future_df['day_name'] = future_df['timestamp'].dt.day_name()
-    future_df['day_of_month'] = future_df['timestamp'].dt.day
-    future_df['month'] = future_df['timestamp'].dt.month
-    future_df['quarter'] = future_df['timestamp'].dt.quarter
-    future_df['year'] = future_df['timestamp'].dt.year
-    future_df['is_weekend'] = (future_df['day_of_week'] >= 5).astype(int)
-
-    features = ['hour', 'day_of_week', 'day_of_month', 'month', 'quarter', 'year', 'is_weekend']
-    future_features = future_df[features]
-    future_df['predicted_load_mw'] = model.predict(future_features)
 
     # --- UPDATED LOGIC TO PRINT A TIME RANGE ---
     # Find the single highest and lowest load points